@@ -130,6 +130,33 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'static'),
 ]
 
+# Cache em disco de relatórios e gráficos (core/utils/artifact_cache.py)
+
+ARTIFACT_CACHE_DIR = os.getenv("ARTIFACT_CACHE_DIR", os.path.join(BASE_DIR, "core", "utils", "cache"))
+ARTIFACT_CACHE_MAX_MB = int(os.getenv("ARTIFACT_CACHE_MAX_MB", "256"))
+
+# Cache de respostas GET da API (core/api/http_cache.py). Em arquivo por
+# padrão, compartilhado pelos workers do gunicorn; em testes ou num só
+# processo, CACHE_BACKEND=django.core.cache.backends.locmem.LocMemCache.
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.filebased.FileBasedCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", os.path.join(BASE_DIR, "core", "utils", "cache_respostas")),
+        "TIMEOUT": int(os.getenv("CACHE_TIMEOUT", "3600")),
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("CACHE_MAX_ENTRIES", "5000"))},
+    }
+}
+
+# Processos por worker web para renderizar gráficos sob demanda (core/utils/charts.py)
+
+CHARTS_WORKERS = int(os.getenv("CHARTS_WORKERS", "2"))
+
+# Registro em memória de WaterParameter (core/services/parameters_service.py):
+# intervalo máximo entre consultas ao contador de versão
+
+PARAMETROS_REVALIDAR_SEGUNDOS = float(os.getenv("PARAMETROS_REVALIDAR_SEGUNDOS", "5"))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -1,21 +1,55 @@
+from django.db import IntegrityError
 from ninja import Router, Query
+from ninja.decorators import decorate_view
+from ninja.errors import HttpError
+from ninja.pagination import paginate
+from core.api.http_cache import resposta_versionada
+from core.api.pagination import KeysetPagination
 from typing import Optional, List
-from core.schemas import WaterAnalysisSchema, WaterAnalysisSchemaUpdate
+from core.schemas import (
+    WaterAnalysisSchema,
+    WaterAnalysisSchemaUpdate,
+    WaterAnalysisBulkSchema,
+    WaterAnalysisBulkResultSchema,
+    WaterAnalysisUpsertResultSchema,
+)
 from core.services import analysis_service
 
 router = Router(tags=["Análises de Água"])
 
 @router.get("/", response=list[WaterAnalysisSchema])
-def listar_analises(request, ids: Optional[List[str]] = Query(None)):
+@decorate_view(resposta_versionada("wateranalysis"))
+@paginate(KeysetPagination, ordering=("data_da_coleta", "id"))
+async def listar_analises(request, ids: Optional[List[str]] = Query(None)):
     return analysis_service.listar_analises(ids)
 
 @router.post("/", response=WaterAnalysisSchema)
 def criar_analise(request, payload: WaterAnalysisSchema):
-    return analysis_service.criar_analise(payload.dict(exclude_unset=True))
+    try:
+        return analysis_service.criar_analise(payload.dict(exclude_unset=True))
+    except IntegrityError:
+        raise HttpError(409, "Análise já cadastrada para este ponto, parâmetro e data da coleta")
+
+@router.post("/bulk", response=WaterAnalysisBulkResultSchema)
+def criar_analises_lote(request, payload: WaterAnalysisBulkSchema):
+    return analysis_service.criar_analises_lote(
+        [item.model_dump(exclude_unset=True) for item in payload.itens],
+        tudo_ou_nada=payload.tudo_ou_nada,
+    )
+
+@router.put("/bulk", response=WaterAnalysisUpsertResultSchema)
+def upsert_analises(request, payload: WaterAnalysisBulkSchema):
+    return analysis_service.upsert_analises(
+        [item.model_dump(exclude_unset=True) for item in payload.itens],
+        tudo_ou_nada=payload.tudo_ou_nada,
+    )
 
 @router.put("/{analise_id}", response=WaterAnalysisSchema)
 def atualizar_analise(request, analise_id: str, payload: WaterAnalysisSchemaUpdate):
-    return analysis_service.atualizar_analise(analise_id, payload.dict(exclude_unset=True))
+    try:
+        return analysis_service.atualizar_analise(analise_id, payload.dict(exclude_unset=True))
+    except IntegrityError:
+        raise HttpError(409, "Já existe outra análise para este ponto, parâmetro e data da coleta")
 
 @router.delete("/{analise_id}")
 def deletar_analise(request, analise_id: str):
@@ -0,0 +1,28 @@
+from typing import Literal
+from uuid import UUID
+from ninja import Router
+from core.api.http_cache import arquivo_async, etag_confere, marcar, nao_modificado
+from core.services import data_version_service
+from core.utils import charts
+
+router = Router(tags=["Gráficos"])
+
+@router.get("/{dimensao}/{chave}", response={404: dict})
+async def grafico_mensal(
+    request,
+    dimensao: Literal["clinica", "parametro"],
+    chave: UUID,
+    formato: Literal["png", "svg"] = "png",
+):
+    versao = await data_version_service.aversao_dados()
+    etag = f'"{versao}-{dimensao}-{chave}-{formato}"'
+
+    if etag_confere(request, etag):
+        return nao_modificado(etag)
+
+    artefato = await charts.aobter_grafico(dimensao, chave, formato, versao=versao)
+    if artefato is None:
+        return 404, {"detail": "Sem análises para este gráfico"}
+
+    response = arquivo_async(artefato, charts.FORMATOS[formato])
+    return marcar(response, etag)
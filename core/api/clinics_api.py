@@ -1,12 +1,18 @@
 from typing import Optional, List
 from ninja import Query, Router, Form
+from ninja.decorators import decorate_view
+from ninja.pagination import paginate
+from core.api.http_cache import resposta_versionada
+from core.api.pagination import KeysetPagination
 from core.schemas import ClinicSchema, ClinicSchemaUpdate, PointSchema
 from core.services import clinics_service
 
 router = Router(tags=["Clínicas"])
 
 @router.get("/", response=list[ClinicSchema])
-def get_clinics(request, ids: List[str] = Query(None)):
+@decorate_view(resposta_versionada("clinics"))
+@paginate(KeysetPagination, ordering=("nome", "id"))
+async def get_clinics(request, ids: List[str] = Query(None)):
     return clinics_service.listar_clinicas(ids)
 
 @router.post("/", response=ClinicSchema)
@@ -28,5 +34,7 @@ def delete_clinic(request, clinic_id: str):
     return {"success": True}
 
 @router.get("/points/{clinic_id}", response=list[PointSchema])
-def get_clinic_points(request, clinic_id: str):
+@decorate_view(resposta_versionada("point", "clinics"))
+@paginate(KeysetPagination, ordering=("nome", "id"))
+async def get_clinic_points(request, clinic_id: str):
     return clinics_service.listar_pontos_clinica(clinic_id)
\ No newline at end of file
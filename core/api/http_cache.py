@@ -0,0 +1,123 @@
+import hashlib
+from functools import wraps
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from core.services import data_version_service
+
+
+def etag_confere(request, etag):
+    """True se o If-None-Match do cliente já tem este ETag."""
+    enviados = request.headers.get("If-None-Match", "")
+    return any(
+        valor.strip().removeprefix("W/") in (etag, "*")
+        for valor in enviados.split(",")
+    )
+
+
+def nao_modificado(etag):
+    response = HttpResponseNotModified()
+    response["ETag"] = etag
+    return response
+
+
+def arquivo_async(caminho, content_type, bloco=64 * 1024):
+    """
+    Resposta com um arquivo do cache para views async. FileResponse
+    itera o arquivo de forma síncrona, o que o ASGI do Django só faz
+    com aviso; aqui cada bloco é lido numa thread.
+    """
+    async def partes():
+        with open(caminho, "rb") as arquivo:
+            ler = sync_to_async(arquivo.read, thread_sensitive=False)
+            while parte := await ler(bloco):
+                yield parte
+
+    response = StreamingHttpResponse(partes(), content_type=content_type)
+    response["Content-Length"] = caminho.stat().st_size
+    return response
+
+
+def marcar(response, etag):
+    """ETag + revalidação obrigatória (o cliente guarda, mas pergunta)."""
+    response["ETag"] = etag
+    response["Cache-Control"] = "no-cache"
+    return response
+
+
+# -------------------------------------------------
+# GETs versionados por tabela
+# -------------------------------------------------
+# Aplicado com @decorate_view, envolve a operação inteira do Ninja: o
+# 304 e o acerto no cache saem antes de parâmetros, ORM e Pydantic (só
+# o contador de DataVersion é lido). A versão entra na chave, então uma
+# escrita torna as entradas antigas inalcançáveis; elas expiram pelo
+# TIMEOUT do cache.
+
+def _chave_cache(request, versao):
+    url = hashlib.sha1(request.get_full_path().encode()).hexdigest()
+    return f"resposta:{versao}:{url}"
+
+
+def _de_cache(guardada, etag):
+    conteudo, content_type = guardada
+    return marcar(HttpResponse(conteudo, content_type=content_type), etag)
+
+
+def _cacheavel(response):
+    return response.status_code == 200 and not response.streaming
+
+
+def resposta_versionada(*tabelas):
+    """
+    Para GETs que só dependem das tabelas dadas: ETag da versão delas
+    e corpo guardado no cache do Django por (versão, URL). Serve
+    operações sync e async.
+
+    Uso:
+        @router.get("/", response=...)
+        @decorate_view(resposta_versionada("waterparameter"))
+    """
+    def decorador(run):
+        if iscoroutinefunction(run):
+            @wraps(run)
+            async def executar_async(request, **kwargs):
+                versao = await data_version_service.aversao_tabelas(tabelas)
+                etag = f'"{versao}"'
+                if etag_confere(request, etag):
+                    return nao_modificado(etag)
+
+                chave = _chave_cache(request, versao)
+                guardada = await cache.aget(chave)
+                if guardada is not None:
+                    return _de_cache(guardada, etag)
+
+                response = await run(request, **kwargs)
+                if not _cacheavel(response):
+                    return response
+                await cache.aset(chave, (response.content, response["Content-Type"]))
+                return marcar(response, etag)
+
+            return executar_async
+
+        @wraps(run)
+        def executar(request, **kwargs):
+            versao = data_version_service.versao_tabelas(tabelas)
+            etag = f'"{versao}"'
+            if etag_confere(request, etag):
+                return nao_modificado(etag)
+
+            chave = _chave_cache(request, versao)
+            guardada = cache.get(chave)
+            if guardada is not None:
+                return _de_cache(guardada, etag)
+
+            response = run(request, **kwargs)
+            if not _cacheavel(response):
+                return response
+            cache.set(chave, (response.content, response["Content-Type"]))
+            return marcar(response, etag)
+
+        return executar
+
+    return decorador
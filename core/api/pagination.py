@@ -0,0 +1,97 @@
+import base64
+import json
+from typing import Any, List, Optional
+from django.db.models import Q, QuerySet
+from ninja import Field, Schema
+from ninja.errors import HttpError
+from ninja.pagination import AsyncPaginationBase
+
+
+class KeysetPagination(AsyncPaginationBase):
+    """
+    Paginação por cursor (keyset) numa ordenação estável, ex.
+    ("data_da_coleta", "id"). A página seguinte é buscada com
+    WHERE (campos) > (valores da última linha), então o custo não cresce
+    com a posição na lista. O cursor é opaco (base64 dos valores).
+    COUNT(*) só com with_count=true. Serve views sync e async.
+
+    Uso:
+        @paginate(KeysetPagination, ordering=("data_da_coleta", "id"))
+    """
+
+    class Input(Schema):
+        limit: int = Field(50, ge=1, le=1000, description="Itens por página")
+        cursor: Optional[str] = Field(None, description="next_cursor da página anterior")
+        with_count: bool = Field(False, description="Inclui o total (COUNT(*))")
+
+    class Output(Schema):
+        items: List[Any]
+        next_cursor: Optional[str] = None
+        count: Optional[int] = None
+
+    def __init__(self, *, ordering=("id",), **kwargs: Any) -> None:
+        self.ordering = tuple(ordering)
+        super().__init__(**kwargs)
+
+    # -------------------------------------------------
+
+    def _campos(self):
+        # ("-data_da_coleta", "id") → [("data_da_coleta", True), ("id", False)]
+        return [(campo.lstrip("-"), campo.startswith("-")) for campo in self.ordering]
+
+    def _codificar(self, item):
+        valores = [str(getattr(item, campo)) for campo, _ in self._campos()]
+        return base64.urlsafe_b64encode(json.dumps(valores).encode()).decode()
+
+    def _decodificar(self, model, cursor):
+        try:
+            valores = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            campos = self._campos()
+            if len(valores) != len(campos):
+                raise ValueError
+            return [
+                model._meta.get_field(campo).to_python(valor)
+                for (campo, _), valor in zip(campos, valores)
+            ]
+        except Exception:
+            raise HttpError(400, "Cursor inválido")
+
+    def _depois_de(self, valores):
+        # (a, b) > (va, vb)  ⇔  a > va OR (a = va AND b > vb)
+        condicao = Q()
+        anteriores = {}
+        for (campo, desc), valor in zip(self._campos(), valores):
+            lookup = f"{campo}__lt" if desc else f"{campo}__gt"
+            condicao |= Q(**anteriores, **{lookup: valor})
+            anteriores[campo] = valor
+        return condicao
+
+    # -------------------------------------------------
+
+    def _pagina(self, queryset, pagination):
+        pagina = queryset.order_by(*self.ordering)
+
+        if pagination.cursor:
+            valores = self._decodificar(queryset.model, pagination.cursor)
+            pagina = pagina.filter(self._depois_de(valores))
+
+        # uma linha a mais diz se existe próxima página, sem COUNT
+        return pagina[: pagination.limit + 1]
+
+    def _resultado(self, items, pagination, count):
+        proxima = None
+        if len(items) > pagination.limit:
+            items = items[: pagination.limit]
+            proxima = self._codificar(items[-1])
+
+        return {"items": items, "next_cursor": proxima, "count": count}
+
+    def paginate_queryset(self, queryset: QuerySet, pagination: Input, **params: Any) -> Any:
+        items = list(self._pagina(queryset, pagination))
+        count = self._items_count(queryset) if pagination.with_count else None
+        return self._resultado(items, pagination, count)
+
+    async def apaginate_queryset(self, queryset: QuerySet, pagination: Input, **params: Any) -> Any:
+        items = [item async for item in self._pagina(queryset, pagination)]
+        count = await self._aitems_count(queryset) if pagination.with_count else None
+        return self._resultado(items, pagination, count)
@@ -1,4 +1,8 @@
 from ninja import Router, Query
+from ninja.decorators import decorate_view
+from ninja.pagination import paginate
+from core.api.http_cache import resposta_versionada
+from core.api.pagination import KeysetPagination
 from typing import Optional, List
 from core.schemas import WaterParameterSchema, WaterParameterSchemaUpdate
 from core.services import parameters_service
@@ -6,7 +10,9 @@ from core.services import parameters_service
 router = Router(tags=["Parâmetros de Análise"])
 
 @router.get("/", response=list[WaterParameterSchema])
-def listar_parametros(request, ids: Optional[List[str]] = Query(None)):
+@decorate_view(resposta_versionada("waterparameter"))
+@paginate(KeysetPagination, ordering=("nome", "id"))
+async def listar_parametros(request, ids: Optional[List[str]] = Query(None)):
     return parameters_service.listar_parametros(ids)
 
 @router.post("/", response=WaterParameterSchema)
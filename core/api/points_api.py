@@ -1,4 +1,8 @@
 from ninja import Router, Query
+from ninja.decorators import decorate_view
+from ninja.pagination import paginate
+from core.api.http_cache import resposta_versionada
+from core.api.pagination import KeysetPagination
 from typing import Optional, List
 from core.schemas import PointSchema, PointSchemaUpdate, PointSchemaCreate
 from core.services import points_service
@@ -6,7 +10,9 @@ from core.services import points_service
 router = Router(tags=["Pontos de Água"])
 
 @router.get("/", response=list[PointSchema])
-def listar_pontos(request, ids: Optional[List[str]] = Query(None)):
+@decorate_view(resposta_versionada("point", "clinics"))
+@paginate(KeysetPagination, ordering=("nome", "id"))
+async def listar_pontos(request, ids: Optional[List[str]] = Query(None)):
     return points_service.listar_pontos(ids)
 
 @router.post("/", response=PointSchema)
@@ -0,0 +1,49 @@
+from itertools import islice
+from typing import Literal
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from ninja import Router
+from core.api.http_cache import arquivo_async, etag_confere, marcar, nao_modificado
+from core.services import data_version_service
+from core.utils import artifact_cache
+from core.utils.report import EXTENSOES, nome_artefato, stream_report
+
+router = Router(tags=["Relatórios"])
+
+CONTENT_TYPES = {
+    "text": "text/plain; charset=utf-8",
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson; charset=utf-8",
+}
+
+async def _partes_async(partes, lote=500):
+    # o gerador usa cursores do ORM: cada lote roda na thread da requisição
+    proximas = sync_to_async(lambda: list(islice(partes, lote)))
+    while bloco := await proximas():
+        yield "".join(bloco)
+
+@router.get("/")
+async def relatorio(request, formato: Literal["text", "csv", "jsonl"] = "text"):
+    now = timezone.localtime()
+    versao = await data_version_service.aversao_dados(hoje=now.date())
+    etag = f'"{versao}-{formato}"'
+
+    if etag_confere(request, etag):
+        return nao_modificado(etag)
+
+    nome = nome_artefato(formato)
+    artefato = artifact_cache.obter(nome, versao)
+
+    if artefato is not None:
+        response = arquivo_async(artefato, CONTENT_TYPES[formato])
+    else:
+        # gera em streaming e grava uma cópia no cache ao terminar
+        response = StreamingHttpResponse(
+            _partes_async(artifact_cache.armazenar_stream(nome, versao, stream_report(formato, now))),
+            content_type=CONTENT_TYPES[formato],
+        )
+
+    filename = f"report_{now.strftime('%d-%m-%Y_%H-%M')}.{EXTENSOES[formato]}"
+    response["Content-Disposition"] = f'inline; filename="{filename}"'
+    return marcar(response, etag)
@@ -0,0 +1,34 @@
+from typing import Optional
+from uuid import UUID
+from ninja import Router, Query
+from ninja.pagination import paginate, LimitOffsetPagination
+from core.schemas import ScheduleRequestSchema, SchedulePlanSchema, ScheduledCollectionSchema
+from core.services import schedule_service
+
+router = Router(tags=["Planejamento de Coletas"])
+
+@router.post("/", response={202: SchedulePlanSchema})
+async def enfileirar_plano(request, payload: ScheduleRequestSchema):
+    # o solver roda no run_schedule_worker; aqui só entra na fila
+    return 202, await schedule_service.aenfileirar_plano(payload)
+
+@router.get("/", response=list[SchedulePlanSchema])
+async def listar_planos(request, limite: int = 20):
+    return await schedule_service.alistar_planos(limite)
+
+@router.get("/{plano_id}", response={200: SchedulePlanSchema, 404: dict})
+async def obter_plano(request, plano_id: UUID):
+    plano = await schedule_service.aobter_plano(plano_id)
+    if plano is None:
+        return 404, {"detail": "Plan not found"}
+    return plano
+
+@router.get("/{plano_id}/coletas", response=list[ScheduledCollectionSchema])
+@paginate(LimitOffsetPagination)
+async def listar_coletas(
+    request,
+    plano_id: UUID,
+    mes: Optional[str] = Query(None, pattern=r"^\d{4}-(0[1-9]|1[0-2])$", description="Mês planejado (AAAA-MM)"),
+    clinica: Optional[UUID] = None,
+):
+    return schedule_service.listar_coletas(plano_id, mes, clinica)
@@ -0,0 +1,50 @@
+from datetime import date
+from typing import List, Optional
+from uuid import UUID
+from ninja import Router, Query
+from ninja.decorators import decorate_view
+from core.api.http_cache import resposta_versionada
+from core.schemas import (
+    PointType,
+    TimeseriesGroup,
+    TimeseriesMetric,
+    TimeseriesPeriod,
+    TimeseriesPointSchema,
+)
+from core.services import rollup_service
+
+router = Router(tags=["Estatísticas"])
+
+@router.get(
+    "/timeseries",
+    response=list[TimeseriesPointSchema],
+    exclude_none=True,
+    description=(
+        "Lê os agregados recalculados pelo refresh_rollups (cron): escritas e "
+        "vencimentos posteriores à última atualização entram na próxima. O ETag "
+        "muda com a atualização dos agregados e com escritas que deixam meses pendentes."
+    ),
+)
+# escritas em análises e pontos marcam meses pendentes: mudam o ETag
+@decorate_view(resposta_versionada("analysisrollup", "wateranalysis", "point"))
+def serie_temporal(
+    request,
+    periodo: TimeseriesPeriod = TimeseriesPeriod.MES,
+    agrupar: List[TimeseriesGroup] = Query([]),
+    metricas: List[TimeseriesMetric] = Query([TimeseriesMetric.TOTAL]),
+    inicio: Optional[date] = None,
+    fim: Optional[date] = None,
+    clinica: Optional[UUID] = None,
+    tipo_ponto: Optional[PointType] = None,
+    parametro: Optional[UUID] = None,
+):
+    return rollup_service.serie_temporal(
+        periodo=periodo.value,
+        agrupar=[a.value for a in agrupar],
+        metricas=[m.value for m in metricas],
+        inicio=inicio,
+        fim=fim,
+        clinica=clinica,
+        tipo_ponto=tipo_ponto.value if tipo_ponto else None,
+        parametro=parametro,
+    )
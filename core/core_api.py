@@ -5,6 +5,10 @@ from core.api.clinics_api import router as clinics_router
 from core.api.points_api import router as points_router
 from core.api.analysis_api import router as analysis_router
 from core.api.parameters_api import router as parameters_router
+from core.api.schedule_api import router as schedule_router
+from core.api.reports_api import router as reports_router
+from core.api.charts_api import router as charts_router
+from core.api.stats_api import router as stats_router
 
 api = NinjaAPI(title="Gestão Água API")
 
@@ -15,4 +19,8 @@ def validation_errors(request, exc):
 api.add_router("/clinics", clinics_router)
 api.add_router("/points/", points_router)
 api.add_router("/parameters/", parameters_router)
-api.add_router("/analysis/", analysis_router)
\ No newline at end of file
+api.add_router("/analysis/", analysis_router)
+api.add_router("/schedule/", schedule_router)
+api.add_router("/reports/", reports_router)
+api.add_router("/charts/", charts_router)
+api.add_router("/stats/", stats_router)
\ No newline at end of file
@@ -0,0 +1,182 @@
+import http.client
+import json
+import os
+import platform
+import statistics
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+
+BENCH_DIR = Path(__file__).resolve().parents[2] / "utils" / "bench"
+
+ROTAS_PADRAO = (
+    "/api/parameters/",
+    "/api/clinics/?limit=20",
+    "/api/points/?limit=200",
+    "/api/analysis/?limit=500",
+    "/api/schedule/",
+)
+
+
+def _percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+
+def _cliente(base, caminhos, requisicoes, deslocamento, latencias, erros, parar=None):
+    # uma conexão keep-alive por cliente, como um navegador
+    conexao = http.client.HTTPConnection(base.hostname, base.port, timeout=120)
+    for i in range(requisicoes):
+        if parar is not None and parar.is_set():
+            break
+        caminho = caminhos[(deslocamento + i) % len(caminhos)]
+        inicio = time.perf_counter()
+        try:
+            conexao.request("GET", caminho)
+            resposta = conexao.getresponse()
+            resposta.read()
+            if resposta.status >= 400:
+                raise http.client.HTTPException(resposta.status)
+        except (OSError, http.client.HTTPException):
+            erros.append(caminho)
+            conexao.close()
+            continue
+        latencias.append(time.perf_counter() - inicio)
+    conexao.close()
+
+
+class Command(BaseCommand):
+    help = "Teste de carga de GETs da API (clientes concorrentes com keep-alive)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--base",
+            default="http://127.0.0.1:8000",
+            help="Servidor já em execução (gunicorn/uvicorn)"
+        )
+        parser.add_argument(
+            "--rotas",
+            nargs="+",
+            default=list(ROTAS_PADRAO),
+            help="Caminhos requisitados em rodízio"
+        )
+        parser.add_argument(
+            "--concorrencia",
+            nargs="+",
+            type=int,
+            default=[1, 10, 50],
+            help="Clientes simultâneos (um nível por execução)"
+        )
+        parser.add_argument(
+            "--requisicoes",
+            type=int,
+            default=2000,
+            help="Requisições por nível de concorrência"
+        )
+        parser.add_argument(
+            "--fundo",
+            nargs="*",
+            default=[],
+            help="Rotas lentas requisitadas sem parar durante a medição (não entram nas latências)"
+        )
+        parser.add_argument(
+            "--clientes-fundo",
+            type=int,
+            default=2,
+            help="Clientes simultâneos nas rotas de --fundo"
+        )
+        parser.add_argument(
+            "--rotulo",
+            default="",
+            help="Identifica a configuração do servidor no arquivo de saída"
+        )
+        parser.add_argument(
+            "--output",
+            default=str(BENCH_DIR / "api_bench.jsonl"),
+            help="Arquivo JSON Lines onde cada execução é acrescentada"
+        )
+
+    # -------------------------------------------------
+
+    def handle(self, *args, **options):
+
+        base = urlsplit(options["base"])
+        if base.scheme != "http" or not base.hostname:
+            raise CommandError("--base deve ser http://host:porta")
+
+        output = Path(options["output"])
+        output.parent.mkdir(parents=True, exist_ok=True)
+        executado_em = timezone.localtime().isoformat()
+
+        for concorrencia in options["concorrencia"]:
+            latencias, erros = [], []
+            por_cliente = max(1, options["requisicoes"] // concorrencia)
+
+            clientes = [
+                threading.Thread(
+                    target=_cliente,
+                    args=(base, options["rotas"], por_cliente, i, latencias, erros),
+                )
+                for i in range(concorrencia)
+            ]
+
+            # carga lenta concorrente: mede se ela trava as rotas rápidas
+            parar = threading.Event()
+            fundo_latencias, fundo_erros = [], []
+            fundo = [
+                threading.Thread(
+                    target=_cliente,
+                    args=(base, options["fundo"], 10**9, i, fundo_latencias, fundo_erros, parar),
+                )
+                for i in range(options["clientes_fundo"] if options["fundo"] else 0)
+            ]
+            for cliente in fundo:
+                cliente.start()
+
+            inicio = time.perf_counter()
+            for cliente in clientes:
+                cliente.start()
+            for cliente in clientes:
+                cliente.join()
+            duracao = time.perf_counter() - inicio
+
+            parar.set()
+            for cliente in fundo:
+                cliente.join()
+
+            resultado = {
+                "executado_em": executado_em,
+                "rotulo": options["rotulo"],
+                "base": options["base"],
+                "rotas": options["rotas"],
+                "fundo": options["fundo"],
+                "clientes_fundo": len(fundo),
+                "fundo_concluidas": len(fundo_latencias),
+                "concorrencia": concorrencia,
+                "requisicoes": len(latencias) + len(erros),
+                "erros": len(erros),
+                "segundos": round(duracao, 3),
+                "req_s": round(len(latencias) / duracao, 1),
+                "p50_ms": round(statistics.median(latencias) * 1000, 1) if latencias else None,
+                "p95_ms": round(_percentil(latencias, 95) * 1000, 1) if latencias else None,
+                "p99_ms": round(_percentil(latencias, 99) * 1000, 1) if latencias else None,
+                "cpus": os.cpu_count(),
+                "python": platform.python_version(),
+            }
+
+            with output.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(resultado) + "\n")
+
+            self.stdout.write(
+                f"  c={concorrencia:<4} {resultado['req_s']:>8} req/s  "
+                f"p50={resultado['p50_ms']}ms  p95={resultado['p95_ms']}ms  "
+                f"p99={resultado['p99_ms']}ms  erros={resultado['erros']}"
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"\n✔ Resultados acrescentados em {output}"))
@@ -0,0 +1,176 @@
+import json
+import platform
+import resource
+import time
+from pathlib import Path
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.management.factories.analyses_generator import AnalysesGenerator
+from core.models import Periodicity
+from core.utils.scheduler import (
+    TEMPO_LIMITE,
+    W_DESBALANCEAMENTO,
+    capacidade_mensal,
+    colunas,
+    matriz_custos,
+    resumir_plano,
+)
+from core.utils.solvers import resolver_cpsat, resolver_decomposto, resolver_fluxo
+
+
+BENCH_DIR = Path(__file__).resolve().parents[2] / "utils" / "bench"
+
+
+def _pico_rss_mb():
+    # ru_maxrss é em KB no Linux; é o pico do processo até agora
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+class Command(BaseCommand):
+    help = "Benchmark do scheduler em conjuntos sintéticos (1k..1M análises)"
+
+    ENGINES = ("cpsat", "flow", "decomposto")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            nargs="+",
+            type=int,
+            default=[1_000, 10_000, 100_000, 1_000_000],
+            help="Quantidades de análises a gerar"
+        )
+        parser.add_argument(
+            "--engines",
+            nargs="+",
+            choices=self.ENGINES,
+            default=["cpsat", "flow"],
+            help="Motores a medir"
+        )
+        parser.add_argument(
+            "--clinics",
+            type=int,
+            default=50,
+            help="Número de clínicas fake"
+        )
+        parser.add_argument(
+            "--time-limit",
+            type=float,
+            default=TEMPO_LIMITE,
+            help="Limite de tempo do CP-SAT (segundos)"
+        )
+        parser.add_argument(
+            "--output",
+            default=str(BENCH_DIR / "scheduler_bench.jsonl"),
+            help="Arquivo JSON Lines onde cada execução é acrescentada"
+        )
+
+    # -------------------------------------------------
+
+    def handle(self, *args, **options):
+
+        generator = AnalysesGenerator()
+        hoje = timezone.localtime().date()
+        executado_em = timezone.localtime().isoformat()
+
+        output = Path(options["output"])
+        output.parent.mkdir(parents=True, exist_ok=True)
+
+        for n in options["sizes"]:
+
+            rows = generator.build_rows(
+                n,
+                clinicas=options["clinics"],
+                periodicidades=[Periodicity.ANUAL, Periodicity.SEMESTRAL],
+            )
+
+            # ---------------- load ----------------
+            inicio = time.perf_counter()
+            dados = colunas(rows)
+            tempo_load = time.perf_counter() - inicio
+
+            del rows
+
+            # ---------------- build ---------------
+            inicio = time.perf_counter()
+            custos = matriz_custos(dados, hoje)
+            max_por_mes = capacidade_mensal(n)
+            tempo_build = time.perf_counter() - inicio
+
+            for engine in options["engines"]:
+
+                metricas = {}
+
+                # ---------------- solve ---------------
+                inicio = time.perf_counter()
+                escolha = self._resolver(
+                    engine, custos, dados, max_por_mes, options["time_limit"], metricas
+                )
+                tempo_solve = time.perf_counter() - inicio
+
+                # ---------------- report --------------
+                tempo_report = None
+                custo_total = None
+
+                if escolha is not None:
+                    inicio = time.perf_counter()
+                    resumo = resumir_plano(dados, custos, escolha, hoje)
+                    tempo_report = time.perf_counter() - inicio
+                    custo_total = resumo["total_cost"]
+
+                registro = {
+                    "executado_em": executado_em,
+                    "host": platform.node(),
+                    "python": platform.python_version(),
+                    "n": n,
+                    "engine": engine,
+                    "tempos": {
+                        "load": round(tempo_load, 4),
+                        "build": round(tempo_build, 4),
+                        "solve": round(tempo_solve, 4),
+                        "report": round(tempo_report, 4) if tempo_report is not None else None,
+                    },
+                    "pico_rss_mb": _pico_rss_mb(),
+                    "status": metricas.get("status"),
+                    "objetivo": metricas.get("objetivo"),
+                    "custo_total": custo_total,
+                    "solver": metricas,
+                }
+
+                with open(output, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(registro) + "\n")
+
+                self.stdout.write(
+                    f"N={n:>9} | {engine:<10} | load={tempo_load:.2f}s "
+                    f"build={tempo_build:.2f}s solve={tempo_solve:.2f}s "
+                    f"report={tempo_report or 0:.2f}s | "
+                    f"RSS={registro['pico_rss_mb']}MB | "
+                    f"{registro['status']} | custo={custo_total}"
+                )
+
+        self.stdout.write(self.style.SUCCESS(f"\n✔ Resultados em {output}"))
+
+    # -------------------------------------------------
+
+    def _resolver(self, engine, custos, dados, max_por_mes, tempo_limite, metricas):
+
+        if engine == "flow":
+            return resolver_fluxo(custos, max_por_mes, metricas=metricas)
+
+        if engine == "decomposto":
+            return resolver_decomposto(
+                custos,
+                dados["clinicas"],
+                max_por_mes,
+                W_DESBALANCEAMENTO,
+                tempo_limite=tempo_limite,
+                metricas=metricas,
+            )
+
+        return resolver_cpsat(
+            custos,
+            max_por_mes,
+            W_DESBALANCEAMENTO,
+            tempo_limite=tempo_limite,
+            metricas=metricas,
+        )
@@ -0,0 +1,91 @@
+import time
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.management.factories.analyses_generator import AnalysesGenerator
+from core.models import Periodicity
+from core.utils.scheduler import (
+    W_DESBALANCEAMENTO,
+    capacidade_mensal,
+    colunas,
+    matriz_custos,
+)
+from core.utils.solvers import resolver_cpsat, resolver_fluxo
+
+
+class Command(BaseCommand):
+    help = "Compara os motores do scheduler (CP-SAT × fluxo de custo mínimo) em dados sintéticos"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            nargs="+",
+            type=int,
+            default=[1_000, 10_000, 100_000],
+            help="Quantidades de análises a gerar"
+        )
+        parser.add_argument(
+            "--time-limit",
+            type=float,
+            default=30,
+            help="Limite de tempo do CP-SAT (segundos)"
+        )
+        parser.add_argument(
+            "--no-aggregate",
+            action="store_true",
+            help="CP-SAT com um booleano por análise (sem classes de custo)"
+        )
+
+    # -------------------------------------------------
+
+    def handle(self, *args, **options):
+
+        generator = AnalysesGenerator()
+        hoje = timezone.localtime().date()
+
+        self.stdout.write(
+            f"{'N':>10} | {'custo fluxo':>12} | {'tempo fluxo':>11} | "
+            f"{'custo CP-SAT':>12} | {'tempo CP-SAT':>12} | {'speedup':>8}"
+        )
+
+        for n in options["sizes"]:
+
+            dados = colunas(generator.build_rows(
+                n, periodicidades=[Periodicity.ANUAL, Periodicity.SEMESTRAL]
+            ))
+
+            custos = matriz_custos(dados, hoje)
+            max_por_mes = capacidade_mensal(n)
+
+            inicio = time.perf_counter()
+            fluxo = resolver_fluxo(custos, max_por_mes)
+            tempo_fluxo = time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            cpsat = resolver_cpsat(
+                custos, max_por_mes, W_DESBALANCEAMENTO,
+                tempo_limite=options["time_limit"],
+                agregar=not options["no_aggregate"],
+            )
+            tempo_cpsat = time.perf_counter() - inicio
+
+            custo_fluxo = self._custo(custos, fluxo)
+            custo_cpsat = self._custo(custos, cpsat)
+
+            self.stdout.write(
+                f"{n:>10} | {custo_fluxo:>12} | {tempo_fluxo:>10.2f}s | "
+                f"{custo_cpsat:>12} | {tempo_cpsat:>11.2f}s | "
+                f"{tempo_cpsat / max(tempo_fluxo, 1e-9):>7.0f}x"
+            )
+
+            if custo_cpsat != "-" and custo_fluxo != "-" and custo_fluxo > custo_cpsat:
+                self.stdout.write(
+                    self.style.ERROR("  ✘ fluxo acima do CP-SAT (não deveria acontecer)")
+                )
+
+    # -------------------------------------------------
+
+    def _custo(self, custos, escolha):
+        if escolha is None:
+            return "-"
+        return int(custos[range(len(escolha)), escolha].sum())
@@ -0,0 +1,72 @@
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services import import_service
+
+
+class Command(BaseCommand):
+    help = "Importa análises históricas de um CSV/XLSX (COPY + INSERT ... SELECT)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "arquivo",
+            help="CSV (, ou ;) ou XLSX com colunas ponto, parametro, valor, data_da_coleta"
+        )
+        parser.add_argument(
+            "--rejeitos",
+            default=None,
+            help="CSV das linhas rejeitadas (padrão: <arquivo>.rejeitos.csv)"
+        )
+        parser.add_argument(
+            "--atualizar",
+            action="store_true",
+            help="Sobrescreve análises já gravadas com o mesmo ponto, parâmetro e data"
+        )
+        parser.add_argument(
+            "--bloco",
+            type=int,
+            default=import_service.BLOCO,
+            help="Linhas validadas e copiadas por vez"
+        )
+
+    # -------------------------------------------------
+
+    def progresso(self, lidas, rejeitadas, segundos):
+        self.stdout.write(
+            f"  {lidas} linhas lidas, {rejeitadas} rejeitadas "
+            f"({lidas / max(segundos, 1e-9):.0f} linhas/s)"
+        )
+
+    def handle(self, *args, **options):
+
+        arquivo = Path(options["arquivo"])
+        if not arquivo.is_file():
+            raise CommandError(f"Arquivo não encontrado: {arquivo}")
+
+        rejeitos = options["rejeitos"] or arquivo.with_name(f"{arquivo.name}.rejeitos.csv")
+
+        try:
+            resumo = import_service.importar(
+                arquivo,
+                rejeitos,
+                atualizar=options["atualizar"],
+                bloco=options["bloco"],
+                progresso=self.progresso,
+            )
+        except ImportError:
+            raise CommandError("Leitura de XLSX requer o pacote openpyxl")
+        except ValueError as erro:
+            raise CommandError(str(erro))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"\n✔ {resumo['gravadas']} análises gravadas de {resumo['lidas']} linhas "
+                f"em {resumo['segundos']:.2f}s "
+                f"({resumo['lidas'] / max(resumo['segundos'], 1e-9):.0f} linhas/s)"
+            )
+        )
+
+        if resumo["rejeitadas"]:
+            self.stdout.write(
+                self.style.WARNING(f"  {resumo['rejeitadas']} linhas rejeitadas → {rejeitos}")
+            )
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from core.services import compliance_service
+
+
+class Command(BaseCommand):
+    help = "Recalcula os resumos de conformidade (clínica/ponto) e mostra divergências"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Só verifica divergências, sem regravar as tabelas"
+        )
+
+    # -------------------------------------------------
+
+    def handle(self, *args, **options):
+
+        divergencias = compliance_service.reconstruir(
+            somente_verificar=options["check"]
+        )
+
+        for nome, linhas in divergencias.items():
+            for linha in linhas[:20]:
+                self.stdout.write(
+                    f"  {nome}: {linha['id']} esperado={linha['esperado']} "
+                    f"gravado={linha['atual']}"
+                )
+            if len(linhas) > 20:
+                self.stdout.write(f"  ... mais {len(linhas) - 20} em {nome}")
+
+        total = sum(len(linhas) for linhas in divergencias.values())
+
+        if options["check"] and total:
+            self.stdout.write(self.style.ERROR(f"\n✘ {total} resumos divergentes"))
+            raise SystemExit(1)
+
+        acao = "verificados" if options["check"] else "reconstruídos"
+        self.stdout.write(
+            self.style.SUCCESS(f"\n✔ Resumos {acao} ({total} divergências encontradas)")
+        )
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from core.services import rollup_service
+
+
+class Command(BaseCommand):
+    help = "Recalcula os agregados de séries temporais dos meses pendentes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Apaga e recalcula todos os meses"
+        )
+
+    # -------------------------------------------------
+
+    def handle(self, *args, **options):
+
+        if options["rebuild"]:
+            meses = rollup_service.reconstruir()
+        else:
+            meses = rollup_service.atualizar_pendentes()
+
+        self.stdout.write(
+            self.style.SUCCESS(f"\n✔ {meses} meses recalculados")
+        )
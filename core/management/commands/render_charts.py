@@ -0,0 +1,47 @@
+import time
+from django.core.management.base import BaseCommand
+
+from core.utils import charts
+
+
+class Command(BaseCommand):
+    help = "Renderiza os gráficos mensais de todas as clínicas e parâmetros em paralelo"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dimensoes",
+            nargs="+",
+            choices=list(charts.DIMENSOES),
+            default=list(charts.DIMENSOES),
+            help="Um gráfico por clínica e/ou por parâmetro"
+        )
+        parser.add_argument(
+            "--formato",
+            choices=list(charts.FORMATOS),
+            default="png",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Processos do pool (padrão: número de núcleos)"
+        )
+
+    # -------------------------------------------------
+
+    def handle(self, *args, **options):
+
+        inicio = time.perf_counter()
+
+        gerados = charts.gerar_lote(
+            dimensoes=options["dimensoes"],
+            formato=options["formato"],
+            max_workers=options["workers"],
+        )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"\n✔ {gerados} gráficos gerados em {time.perf_counter() - inicio:.2f}s "
+                f"(os demais já estavam em cache)"
+            )
+        )
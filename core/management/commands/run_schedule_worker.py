@@ -0,0 +1,79 @@
+import time
+import traceback
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import SchedulePlan, PlanStatus
+from core.utils.scheduler import run_scheduler
+
+
+class Command(BaseCommand):
+    help = "Worker que executa os planos de coleta enfileirados pela API (/api/schedule/)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Processa a fila atual e sai"
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=2.0,
+            help="Intervalo de polling da fila (segundos)"
+        )
+
+    # -------------------------------------------------
+
+    def handle(self, *args, **options):
+
+        self.stdout.write("🧠 Worker do scheduler aguardando planos...")
+
+        while True:
+            plano = self._proximo_plano()
+
+            if plano is None:
+                if options["once"]:
+                    return
+                time.sleep(options["interval"])
+                continue
+
+            self._executar(plano)
+
+    # -------------------------------------------------
+
+    def _proximo_plano(self):
+        # skip_locked: vários workers podem consumir a mesma fila
+        with transaction.atomic():
+            plano = (
+                SchedulePlan.objects
+                .select_for_update(skip_locked=True)
+                .filter(status=PlanStatus.PENDENTE)
+                .order_by("created_at")
+                .first()
+            )
+
+            if plano is None:
+                return None
+
+            plano.status = PlanStatus.EXECUTANDO
+            plano.iniciado_em = timezone.now()
+            plano.save(update_fields=["status", "iniciado_em"])
+
+        return plano
+
+    # -------------------------------------------------
+
+    def _executar(self, plano):
+
+        self.stdout.write(f"→ Executando plano {plano.id}")
+
+        try:
+            run_scheduler(plano=plano, **plano.parametros)
+        except Exception:
+            plano.erro = traceback.format_exc()
+
+        plano.finalizar()
+
+        self.stdout.write(f"✔ Plano {plano.id}: {plano.status}")
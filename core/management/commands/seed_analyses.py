@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from core.management.factories.analyses_generator import AnalysesGenerator
+from core.services import compliance_service
 
 
 class Command(BaseCommand):
@@ -22,6 +23,9 @@ class Command(BaseCommand):
             reset=options["reset"]
         )
 
+        # o gerador grava direto no ORM, fora dos deltas do analysis_service
+        compliance_service.reconstruir()
+
         self.stdout.write(
             self.style.SUCCESS(
                 f"\n✔ {created} análises criadas com sucesso!"
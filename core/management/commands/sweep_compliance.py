@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from core.services import compliance_service
+
+
+class Command(BaseCommand):
+    help = "Varredura diária: move para atrasadas as análises que venceram"
+
+    def handle(self, *args, **options):
+
+        atualizados = compliance_service.varrer_atrasadas()
+
+        self.stdout.write(
+            self.style.SUCCESS(f"\n✔ {atualizados} resumos atualizados")
+        )
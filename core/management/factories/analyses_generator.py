@@ -1,15 +1,18 @@
 import random
+import uuid
 from datetime import timedelta
 from django.utils import timezone
 from django.db import transaction
 
 from core.models import (
+    DIAS_PERIODICIDADE,
     Point,
     WaterParameter,
     WaterAnalysis,
     AnalysisResult,
     Periodicity,
 )
+from core.management.factories.parameters_generator import ParametersGenerator
 
 
 class AnalysesGenerator:
@@ -51,6 +54,11 @@ class AnalysesGenerator:
 
         hoje = timezone.now().date()
 
+        # sem --reset, a chave (ponto, parâmetro, data) já gravada é pulada
+        existentes = set(
+            WaterAnalysis.objects.values_list("ponto_id", "parametro_id", "data_da_coleta")
+        )
+
         counter = 0
         created = 0
 
@@ -73,6 +81,9 @@ class AnalysesGenerator:
                     is_atrasado
                 )
 
+                if (ponto.id, parametro.id, data_coleta) in existentes:
+                    continue
+
                 WaterAnalysis.objects.create(
                     ponto=ponto,
                     parametro=parametro,
@@ -85,6 +96,72 @@ class AnalysesGenerator:
 
         return created
 
+    # -------------------------------------------------
+    # EM MEMÓRIA (benchmarks / comparação de motores)
+    # -------------------------------------------------
+
+    def build_rows(self, total, clinicas=10, periodicidades=None):
+        """
+        Monta `total` análises sem tocar no banco, com a mesma
+        distribuição de reprovadas/atrasadas do seed, espalhadas por
+        pontos fake de `clinicas` clínicas fake.
+
+        Devolve as mesmas tuplas que o scheduler lê do banco:
+        (id, clinica_id, clinica_nome, próxima coleta, resultado).
+        """
+
+        parametros = [
+            WaterParameter(
+                nome=nome,
+                categoria=categoria,
+                unidade=unidade,
+                periodicidade=periodicidade,
+                limite_minimo=min_v,
+                limite_maximo=max_v,
+            )
+            for nome, categoria, unidade, periodicidade, min_v, max_v, _
+            in ParametersGenerator.PARAMETERS
+            if periodicidades is None or periodicidade in periodicidades
+        ]
+
+        clinics = [(uuid.uuid4(), f"Clinica {i + 1}") for i in range(clinicas)]
+
+        reprovadas_idx = set(random.sample(
+            range(total), int(total * random.uniform(*self.REPROVADO_RANGE))
+        ))
+        atrasadas_idx = set(random.sample(
+            range(total), int(total * random.uniform(*self.ATRASO_RANGE))
+        ))
+
+        hoje = timezone.now().date()
+
+        rows = []
+
+        for counter in range(total):
+
+            # um ponto a cada len(parametros) análises, pontos em rodízio
+            ponto = counter // len(parametros)
+            clinica_id, clinica_nome = clinics[ponto % clinicas]
+            parametro = parametros[counter % len(parametros)]
+
+            _, resultado = self._gerar_valor(
+                parametro, counter in reprovadas_idx
+            )
+
+            data_coleta = self._gerar_data(
+                parametro, hoje, counter in atrasadas_idx
+            )
+
+            rows.append((
+                uuid.uuid4(),
+                clinica_id,
+                clinica_nome,
+                data_coleta + timedelta(days=DIAS_PERIODICIDADE[parametro.periodicidade]),
+                resultado,
+            ))
+
+        return rows
+
     # -------------------------------------------------
     # VALORES
     # -------------------------------------------------
@@ -114,11 +191,7 @@ class AnalysesGenerator:
 
     def _gerar_data(self, parametro, hoje, atrasado):
 
-        dias_periodo = {
-            Periodicity.MENSAL: 30,
-            Periodicity.SEMESTRAL: 182,
-            Periodicity.ANUAL: 365,
-        }[parametro.periodicidade]
+        dias_periodo = DIAS_PERIODICIDADE[parametro.periodicidade]
 
         if not atrasado:
             # dentro do prazo normal
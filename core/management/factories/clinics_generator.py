@@ -3,6 +3,7 @@ import string
 from django.db import transaction
 
 from core.models import Clinics, Point, PointType
+from core.services import data_version_service
 
 
 class ClinicsGenerator:
@@ -147,3 +148,4 @@ class ClinicsGenerator:
             counter += 1
 
         Point.objects.bulk_create(points)
+        data_version_service.incrementar("point")  # bulk_create não dispara sinais
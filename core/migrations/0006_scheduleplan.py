@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:14
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_alter_waterparameter_categoria_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchedulePlan',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('PENDENTE', 'Pendente'), ('EXECUTANDO', 'Executando'), ('CONCLUIDO', 'Concluído'), ('FALHOU', 'Falhou')], default='PENDENTE', max_length=15)),
+                ('parametros', models.JSONField(blank=True, default=dict)),
+                ('etapa', models.CharField(blank=True, default='', max_length=50)),
+                ('progresso', models.PositiveSmallIntegerField(default=0)),
+                ('tempos', models.JSONField(blank=True, default=dict)),
+                ('resumo', models.JSONField(blank=True, default=dict)),
+                ('erro', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('iniciado_em', models.DateTimeField(blank=True, null=True)),
+                ('finalizado_em', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_scheduleplan'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduledCollection',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('mes_planejado', models.DateField()),
+                ('custo', models.IntegerField()),
+                ('data_da_proxima_coleta', models.DateField()),
+                ('reprovada', models.BooleanField(default=False)),
+                ('analise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='coletas_planejadas', to='core.wateranalysis')),
+                ('clinica', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='coletas_planejadas', to='core.clinics')),
+                ('plano', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='coletas', to='core.scheduleplan')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['plano', 'mes_planejado'], name='core_schedu_plano_i_3dbaf2_idx'), models.Index(fields=['clinica', 'mes_planejado'], name='core_schedu_clinica_405316_idx')],
+            },
+        ),
+    ]
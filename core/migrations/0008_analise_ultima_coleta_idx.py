@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_scheduledcollection'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='wateranalysis',
+            index=models.Index(fields=['ponto', 'parametro', '-data_da_coleta'], name='analise_ultima_coleta_idx'),
+        ),
+    ]
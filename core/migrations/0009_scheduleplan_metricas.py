@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_analise_ultima_coleta_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scheduleplan',
+            name='metricas',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:22
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_scheduleplan_metricas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClinicComplianceSummary',
+            fields=[
+                ('total', models.IntegerField(default=0)),
+                ('atrasadas', models.IntegerField(default=0)),
+                ('reprovadas', models.IntegerField(default=0)),
+                ('referencia', models.DateField(default=django.utils.timezone.localdate)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('clinica', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='resumo_conformidade', serialize=False, to='core.clinics')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='PointComplianceSummary',
+            fields=[
+                ('total', models.IntegerField(default=0)),
+                ('atrasadas', models.IntegerField(default=0)),
+                ('reprovadas', models.IntegerField(default=0)),
+                ('referencia', models.DateField(default=django.utils.timezone.localdate)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('ponto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='resumo_conformidade', serialize=False, to='core.point')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_dataversion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='wateranalysis',
+            index=models.Index(fields=['data_da_proxima_coleta'], name='analise_proxima_coleta_idx'),
+        ),
+    ]
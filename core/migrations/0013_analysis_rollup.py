@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:28
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_analise_proxima_coleta_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupPendente',
+            fields=[
+                ('mes', models.DateField(primary_key=True, serialize=False)),
+                ('marcado_em', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AnalysisRollup',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('granularidade', models.CharField(choices=[('MES', 'Mês'), ('SEMANA', 'Semana')], max_length=10)),
+                ('inicio', models.DateField()),
+                ('tipo_ponto', models.CharField(choices=[('INFRA', 'Infraestrutura'), ('MAQUINA', 'Máquina')], max_length=10)),
+                ('total', models.IntegerField(default=0)),
+                ('reprovadas', models.IntegerField(default=0)),
+                ('atrasadas', models.IntegerField(default=0)),
+                ('soma_valor', models.FloatField(default=0)),
+                ('min_valor', models.FloatField(blank=True, null=True)),
+                ('max_valor', models.FloatField(blank=True, null=True)),
+                ('referencia', models.DateField(default=django.utils.timezone.localdate)),
+                ('clinica', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.clinics')),
+                ('parametro', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.waterparameter')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('granularidade', 'inicio', 'clinica', 'tipo_ponto', 'parametro'), name='rollup_bucket_unico', nulls_distinct=False)],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_analysis_rollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='wateranalysis',
+            index=models.Index(fields=['data_da_coleta', 'id'], name='analise_coleta_id_idx'),
+        ),
+    ]
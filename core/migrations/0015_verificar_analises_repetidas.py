@@ -0,0 +1,60 @@
+from django.db import migrations
+from django.db.models import Count
+
+
+LISTAR = 20
+
+
+def verificar_repetidas(apps, schema_editor):
+    # a chave natural (0016) não entra com análises repetidas no banco; não
+    # há regra segura para escolher qual resultado de laboratório manter,
+    # então a migração para e lista as chaves para resolução manual
+    WaterAnalysis = apps.get_model("core", "WaterAnalysis")
+
+    repetidas = list(
+        WaterAnalysis.objects
+        .values("ponto_id", "parametro_id", "data_da_coleta")
+        .annotate(n=Count("id"))
+        .filter(n__gt=1)
+        .order_by("data_da_coleta", "ponto_id", "parametro_id")
+    )
+    if not repetidas:
+        return
+
+    linhas = []
+    for chave in repetidas[:LISTAR]:
+        analises = (
+            WaterAnalysis.objects
+            .filter(
+                ponto_id=chave["ponto_id"],
+                parametro_id=chave["parametro_id"],
+                data_da_coleta=chave["data_da_coleta"],
+            )
+            .order_by("id")
+            .values_list("id", "valor", "resultado")
+        )
+        linhas.append(
+            f"  ponto={chave['ponto_id']} parametro={chave['parametro_id']} "
+            f"data={chave['data_da_coleta']}: "
+            + ", ".join(f"{id} (valor={valor}, {resultado})" for id, valor, resultado in analises)
+        )
+    if len(repetidas) > LISTAR:
+        linhas.append(f"  ... e mais {len(repetidas) - LISTAR} chaves")
+
+    raise RuntimeError(
+        f"{len(repetidas)} chaves (ponto, parâmetro, data da coleta) com mais de uma análise:\n"
+        + "\n".join(linhas)
+        + "\nMantenha uma análise por chave (DELETE /api/analysis/{id} atualiza resumos "
+        "e séries) e rode o migrate de novo."
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_analise_coleta_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(verificar_repetidas, migrations.RunPython.noop),
+    ]
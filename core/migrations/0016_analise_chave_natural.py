@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_verificar_analises_repetidas'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='wateranalysis',
+            constraint=models.UniqueConstraint(fields=('ponto', 'parametro', 'data_da_coleta'), name='analise_chave_natural'),
+        ),
+    ]
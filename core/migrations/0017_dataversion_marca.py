@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:13
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_analise_chave_natural'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataversion',
+            name='marca',
+            field=models.UUIDField(default=uuid.uuid4),
+        ),
+    ]
@@ -38,6 +38,13 @@ class Periodicity(models.TextChoices):
     ANUAL = "ANUAL", "Anual"
 
 
+DIAS_PERIODICIDADE = {
+    Periodicity.MENSAL: 30,
+    Periodicity.SEMESTRAL: 182,
+    Periodicity.ANUAL: 365,
+}
+
+
 class Clinics(models.Model):
     id = models.UUIDField(
         primary_key=True,
@@ -128,6 +135,14 @@ class WaterParameter(models.Model):
     limite_maximo = models.FloatField(null=True, blank=True)
     observacoes = models.TextField(blank=True, null=True)
 
+    def avaliar(self, valor):
+        """APROVADO se o valor está dentro dos limites definidos."""
+        if self.limite_minimo is not None and valor < self.limite_minimo:
+            return AnalysisResult.REJEITADO
+        if self.limite_maximo is not None and valor > self.limite_maximo:
+            return AnalysisResult.REJEITADO
+        return AnalysisResult.APROVADO
+
     def __str__(self):
         return f"{self.nome} ({self.categoria})"
 
@@ -144,15 +159,233 @@ class WaterAnalysis(models.Model):
     data_da_coleta = models.DateField(default=timezone.now)
     data_da_proxima_coleta = models.DateField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # última coleta de cada (ponto, parâmetro): DISTINCT ON do scheduler
+            models.Index(
+                fields=["ponto", "parametro", "-data_da_coleta"],
+                name="analise_ultima_coleta_idx",
+            ),
+            # ordem estável da paginação por cursor de /api/analysis/
+            models.Index(
+                fields=["data_da_coleta", "id"],
+                name="analise_coleta_id_idx",
+            ),
+            # atrasadas (< hoje) e filtros por intervalo de próxima coleta
+            models.Index(
+                fields=["data_da_proxima_coleta"],
+                name="analise_proxima_coleta_idx",
+            ),
+        ]
+        constraints = [
+            # chave natural do upsert em lote (ON CONFLICT)
+            models.UniqueConstraint(
+                fields=["ponto", "parametro", "data_da_coleta"],
+                name="analise_chave_natural",
+            ),
+        ]
+
+    def _parametro(self):
+        # sem o objeto carregado, usa o registro em memória (sem consulta)
+        if WaterAnalysis.parametro.is_cached(self):
+            return self.parametro
+        from core.services import parameters_service
+        return parameters_service.obter_parametro(self.parametro_id)
+
+    def preencher_proxima_coleta(self):
+        if not self.data_da_proxima_coleta and self.parametro_id:
+            dias = DIAS_PERIODICIDADE.get(self._parametro().periodicidade)
+            if dias is not None:
+                self.data_da_proxima_coleta = self.data_da_coleta + timedelta(days=dias)
+
     def save(self, *args, **kwargs):
-        if not self.data_da_proxima_coleta and self.parametro:
-            if self.parametro.periodicidade == "MENSAL":
-                self.data_da_proxima_coleta = self.data_da_coleta + timedelta(days=30)
-            elif self.parametro.periodicidade == "SEMESTRAL":
-                self.data_da_proxima_coleta = self.data_da_coleta + timedelta(days=182)
-            elif self.parametro.periodicidade == "ANUAL":
-                self.data_da_proxima_coleta = self.data_da_coleta + timedelta(days=365)
+        self.preencher_proxima_coleta()
         super().save(*args, **kwargs)
 
     def __str__(self):
-        return f"{self.parametro.nome} - {self.ponto.nome} ({self.data_da_coleta})"
\ No newline at end of file
+        return f"{self._parametro().nome} - {self.ponto.nome} ({self.data_da_coleta})"
+
+class PlanStatus(models.TextChoices):
+    PENDENTE = "PENDENTE", "Pendente"
+    EXECUTANDO = "EXECUTANDO", "Executando"
+    CONCLUIDO = "CONCLUIDO", "Concluído"
+    FALHOU = "FALHOU", "Falhou"
+
+
+class SchedulePlan(models.Model):
+    """
+    Uma execução do planejador anual. Criada pela API como job
+    PENDENTE e processada pelo worker (manage.py run_schedule_worker).
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    status = models.CharField(max_length=15, choices=PlanStatus.choices, default=PlanStatus.PENDENTE)
+    parametros = models.JSONField(default=dict, blank=True)
+    etapa = models.CharField(max_length=50, blank=True, default="")
+    progresso = models.PositiveSmallIntegerField(default=0)
+    tempos = models.JSONField(default=dict, blank=True)
+    resumo = models.JSONField(default=dict, blank=True)
+    metricas = models.JSONField(default=dict, blank=True)
+    erro = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    iniciado_em = models.DateTimeField(blank=True, null=True)
+    finalizado_em = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def atualizar_etapa(self, etapa, progresso):
+        self.etapa = etapa
+        self.progresso = progresso
+        self.save(update_fields=["etapa", "progresso"])
+
+    def finalizar(self):
+        self.status = PlanStatus.FALHOU if self.erro else PlanStatus.CONCLUIDO
+        self.progresso = 100
+        self.etapa = ""
+        self.finalizado_em = timezone.now()
+        self.save(update_fields=["status", "progresso", "etapa", "erro", "finalizado_em"])
+
+    def __str__(self):
+        return f"Plano {self.id} ({self.status})"
+
+
+class ScheduledCollection(models.Model):
+    """
+    Coleta planejada de uma análise em um plano. Gravada em um único
+    bulk_create por execução do scheduler; dashboards leem daqui em
+    vez de rodar o otimizador de novo.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    plano = models.ForeignKey(
+        SchedulePlan, on_delete=models.CASCADE, related_name="coletas"
+    )
+    analise = models.ForeignKey(
+        WaterAnalysis, on_delete=models.CASCADE, related_name="coletas_planejadas"
+    )
+    # denormalizado da análise para filtrar por clínica sem join
+    clinica = models.ForeignKey(
+        Clinics, on_delete=models.CASCADE, null=True, blank=True, related_name="coletas_planejadas"
+    )
+    mes_planejado = models.DateField()
+    custo = models.IntegerField()
+    # chave de custo no momento do plano (warm start do próximo)
+    data_da_proxima_coleta = models.DateField()
+    reprovada = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["plano", "mes_planejado"]),
+            models.Index(fields=["clinica", "mes_planejado"]),
+        ]
+
+    def __str__(self):
+        return f"{self.analise_id} → {self.mes_planejado:%m/%Y}"
+
+
+class ComplianceSummary(models.Model):
+    """
+    Contadores de conformidade mantidos por deltas (services/
+    compliance_service.py). "atrasadas" conta as análises com
+    data_da_proxima_coleta < referencia; a varredura diária avança
+    a referencia para hoje.
+    """
+
+    total = models.IntegerField(default=0)
+    atrasadas = models.IntegerField(default=0)
+    reprovadas = models.IntegerField(default=0)
+    referencia = models.DateField(default=timezone.localdate)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+
+class ClinicComplianceSummary(ComplianceSummary):
+    clinica = models.OneToOneField(
+        Clinics, on_delete=models.CASCADE, primary_key=True, related_name="resumo_conformidade"
+    )
+
+    def __str__(self):
+        return f"{self.clinica_id}: {self.total} análises"
+
+
+class PointComplianceSummary(ComplianceSummary):
+    ponto = models.OneToOneField(
+        Point, on_delete=models.CASCADE, primary_key=True, related_name="resumo_conformidade"
+    )
+
+    def __str__(self):
+        return f"{self.ponto_id}: {self.total} análises"
+
+
+class DataVersion(models.Model):
+    """
+    Contador de versão por tabela, incrementado pelos sinais de
+    save/delete (core/signals.py). Caches de relatórios e gráficos usam
+    esses contadores como chave. A marca é nova a cada incremento: um
+    rollback devolve o contador a um número já visto, nunca a marca.
+    """
+
+    tabela = models.CharField(max_length=50, primary_key=True)
+    versao = models.BigIntegerField(default=0)
+    marca = models.UUIDField(default=uuid.uuid4)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.tabela} v{self.versao}"
+
+
+class RollupGranularity(models.TextChoices):
+    MES = "MES", "Mês"
+    SEMANA = "SEMANA", "Semana"
+
+
+class AnalysisRollup(models.Model):
+    """
+    Agregado de análises por (período da coleta, clínica, tipo de ponto,
+    parâmetro). Recalculado por mês "sujo" (RollupPendente) em
+    services/rollup_service.py; a API de séries temporais lê só daqui.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    granularidade = models.CharField(max_length=10, choices=RollupGranularity.choices)
+    inicio = models.DateField()
+    clinica = models.ForeignKey(
+        Clinics, on_delete=models.CASCADE, null=True, blank=True, related_name="+"
+    )
+    tipo_ponto = models.CharField(max_length=10, choices=PointType.choices)
+    parametro = models.ForeignKey(
+        WaterParameter, on_delete=models.CASCADE, related_name="+"
+    )
+    total = models.IntegerField(default=0)
+    reprovadas = models.IntegerField(default=0)
+    # data_da_proxima_coleta < referencia
+    atrasadas = models.IntegerField(default=0)
+    soma_valor = models.FloatField(default=0)
+    min_valor = models.FloatField(null=True, blank=True)
+    max_valor = models.FloatField(null=True, blank=True)
+    referencia = models.DateField(default=timezone.localdate)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["granularidade", "inicio", "clinica", "tipo_ponto", "parametro"],
+                name="rollup_bucket_unico",
+                nulls_distinct=False,
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.granularidade} {self.inicio} ({self.total})"
+
+
+class RollupPendente(models.Model):
+    """Mês de coleta cujos agregados precisam ser recalculados."""
+
+    mes = models.DateField(primary_key=True)
+    marcado_em = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.mes:%m/%Y}"
@@ -1,7 +1,7 @@
-from pydantic import BaseModel, Field, EmailStr, ConfigDict, StringConstraints, field_serializer
+from pydantic import BaseModel, Field, EmailStr, ConfigDict, StringConstraints, field_serializer, model_validator
 from typing import Annotated, Optional
 from uuid import UUID
-from datetime import date
+from datetime import date, datetime
 from enum import Enum
 
 # ========= ENUMS =========
@@ -14,12 +14,18 @@ class PointType(str, Enum):
 class ParameterType(str, Enum):
     FISICO_QUIMICO = "FISICO-QUIMICO"
     MICROBIOLOGICO = "MICROBIOLOGICO"
+    ENDOTOXINA = "ENDOTOXINA"
+    CONDUTIVIDADE = "CONDUTIVIDADE"
+    PH = "PH"
 
 
 class Unit(str, Enum):
     UG_ML = "μg/ml"
     NG_ML = "ng/ml"
+    EU_ML = "EU/ml"
+    UFC_ML = "UFC/mL"
     MG_L = "mg/L"
+    US_CM = "µS/cm"
     PERCENTUAL = "%"
 
 
@@ -135,6 +141,39 @@ class WaterAnalysisSchema(BaseModel):
     data_da_coleta: Optional[date] = Field(default_factory=date.today)
     data_da_proxima_coleta: Optional[date] = None
 
+    @model_validator(mode="before")
+    @classmethod
+    def _ids_do_model(cls, data):
+        # lido do model: usa ponto_id/parametro_id sem carregar os objetos
+        if hasattr(data, "ponto_id"):
+            campos = {campo: getattr(data, campo) for campo in cls.model_fields if campo not in ("ponto", "parametro")}
+            return {**campos, "ponto": data.ponto_id, "parametro": data.parametro_id}
+        return data
+
+
+class WaterAnalysisBulkSchema(BaseModel):
+    itens: list[WaterAnalysisSchema] = Field(..., min_length=1, max_length=5000)
+    tudo_ou_nada: bool = Field(False, description="Não grava nada se alguma linha for inválida")
+
+
+class BulkErrorSchema(BaseModel):
+    indice: int = Field(..., description="Posição da linha em itens")
+    erro: str
+
+
+class WaterAnalysisBulkResultSchema(BaseModel):
+    criadas: int
+    ids: list[UUID] = Field(default_factory=list)
+    erros: list[BulkErrorSchema] = Field(default_factory=list)
+
+
+class WaterAnalysisUpsertResultSchema(BaseModel):
+    criadas: int
+    atualizadas: int
+    inalteradas: int
+    ids: list[UUID] = Field(default_factory=list, description="Uma por linha válida, na ordem de itens")
+    erros: list[BulkErrorSchema] = Field(default_factory=list)
+
 
 class WaterAnalysisSchemaUpdate(BaseModel):
     model_config = ConfigDict(from_attributes=True)
@@ -144,4 +183,91 @@ class WaterAnalysisSchemaUpdate(BaseModel):
     valor: Optional[float] = None
     resultado: Optional[AnalysisResult] = None
     data_da_coleta: Optional[date] = None
-    data_da_proxima_coleta: Optional[date] = None
\ No newline at end of file
+    data_da_proxima_coleta: Optional[date] = None
+
+# ========= SCHEDULE =========
+
+class ScheduleEngine(str, Enum):
+    CPSAT = "cpsat"
+    FLOW = "flow"
+
+
+class PlanStatus(str, Enum):
+    PENDENTE = "PENDENTE"
+    EXECUTANDO = "EXECUTANDO"
+    CONCLUIDO = "CONCLUIDO"
+    FALHOU = "FALHOU"
+
+
+class ScheduleRequestSchema(BaseModel):
+    engine: ScheduleEngine = ScheduleEngine.CPSAT
+    decompose: bool = False
+    warm_start: bool = True
+    repair: bool = False
+    aggregate: bool = True
+    time_limit: float = Field(30, gt=0, description="Limite de tempo do CP-SAT (segundos)")
+    num_workers: int = Field(0, ge=0, description="Workers de busca do CP-SAT (0 = todos os núcleos)")
+    relative_gap: Optional[float] = Field(None, ge=0, description="Para ao atingir este gap relativo")
+    seed: Optional[int] = None
+
+
+class SchedulePlanSchema(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID
+    status: PlanStatus
+    parametros: dict = Field(default_factory=dict)
+    etapa: str = ""
+    progresso: int = Field(0, description="Percentual concluído (0–100)")
+    tempos: dict = Field(default_factory=dict, description="Segundos gastos em cada fase")
+    resumo: dict = Field(default_factory=dict)
+    metricas: dict = Field(default_factory=dict, description="Tamanho do modelo e estatísticas do solver")
+    erro: Optional[str] = None
+    created_at: datetime
+    iniciado_em: Optional[datetime] = None
+    finalizado_em: Optional[datetime] = None
+
+
+class ScheduledCollectionSchema(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    analise_id: UUID
+    clinica_id: Optional[UUID] = None
+    mes_planejado: date
+    custo: int
+
+
+# ========= STATS =========
+
+class TimeseriesPeriod(str, Enum):
+    MES = "mes"
+    SEMANA = "semana"
+
+
+class TimeseriesGroup(str, Enum):
+    CLINICA = "clinica"
+    TIPO_PONTO = "tipo_ponto"
+    PARAMETRO = "parametro"
+
+
+class TimeseriesMetric(str, Enum):
+    TOTAL = "total"
+    REPROVADAS = "reprovadas"
+    ATRASADAS = "atrasadas"
+    MEDIA = "media"
+    MIN = "min"
+    MAX = "max"
+
+
+class TimeseriesPointSchema(BaseModel):
+    inicio: date = Field(..., description="Primeiro dia do mês/semana da coleta")
+    clinica_id: Optional[UUID] = None
+    tipo_ponto: Optional[PointType] = None
+    parametro_id: Optional[UUID] = None
+    total: Optional[int] = None
+    reprovadas: Optional[int] = None
+    atrasadas: Optional[int] = None
+    media: Optional[float] = Field(None, description="Média de valor")
+    min: Optional[float] = None
+    max: Optional[float] = None
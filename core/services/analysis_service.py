@@ -1,26 +1,228 @@
-from core.models import WaterAnalysis, WaterParameter
+import math
+from django.db import transaction
+from django.utils import timezone
+from core.models import Point, WaterAnalysis
+from core.services import compliance_service, data_version_service, parameters_service, rollup_service
 from typing import List, Optional
 
 
 def listar_analises(ids: Optional[List[str]] = None):
     if ids:
-        return list(WaterAnalysis.objects.filter(id__in=ids))
+        return WaterAnalysis.objects.filter(id__in=ids)
     return WaterAnalysis.objects.all()
 
+def _nova_analise(item, ponto, parametro):
+    campos = dict(
+        ponto=ponto,
+        parametro=parametro,
+        valor=item["valor"],
+        resultado=item.get("resultado") or parametro.avaliar(item["valor"]),
+        data_da_coleta=item.get("data_da_coleta") or timezone.localdate(),
+        data_da_proxima_coleta=item.get("data_da_proxima_coleta"),
+    )
+    if item.get("id"):
+        campos["id"] = item["id"]
+    analise = WaterAnalysis(**campos)
+    analise.preencher_proxima_coleta()
+    return analise
+
+@transaction.atomic
 def criar_analise(data):
-    parametro = WaterParameter.objects.get(id=data["parametro"])
-    analise = WaterAnalysis.objects.create(**data)
-    analise.save()  # data_da_proxima_coleta será gerada automaticamente
+    ponto = Point.objects.get(id=data["ponto"])
+    parametro = parameters_service.obter_parametro(data["parametro"])
+    analise = _nova_analise(data, ponto, parametro)
+    analise.save(force_insert=True)  # uma escrita; próxima coleta já calculada
+    compliance_service.registrar_analise(analise)
     return analise
 
+def _resolver_lote(itens):
+    """
+    Resolve pontos e parâmetros de um lote com uma consulta cada.
+    Retorna ([(indice, item, ponto, parametro)], erros por índice).
+    """
+    pontos = Point.objects.only("id", "clinica_id").in_bulk({item["ponto"] for item in itens})
+    parametros = parameters_service.parametros_em_lote({item["parametro"] for item in itens})
+
+    validos, erros = [], []
+    for indice, item in enumerate(itens):
+        ponto = pontos.get(item["ponto"])
+        parametro = parametros.get(item["parametro"])
+
+        if ponto is None:
+            erros.append({"indice": indice, "erro": f"Ponto {item['ponto']} não encontrado"})
+        elif parametro is None:
+            erros.append({"indice": indice, "erro": f"Parâmetro {item['parametro']} não encontrado"})
+        elif not math.isfinite(item["valor"]):
+            erros.append({"indice": indice, "erro": "Valor deve ser um número finito"})
+        else:
+            validos.append((indice, item, ponto, parametro))
+
+    return validos, erros
+
+def _sem_repetidas(resolvidos, erros):
+    """Tira do lote as linhas com chave natural já vista em linha anterior."""
+    validos, vistos = [], {}
+    for indice, item, ponto, parametro in resolvidos:
+        chave = (ponto.id, parametro.id, item["data_da_coleta"])
+        if chave in vistos:
+            erros.append({"indice": indice, "erro": f"Mesma chave da linha {vistos[chave]}"})
+        else:
+            vistos[chave] = indice
+            validos.append((indice, item, ponto, parametro))
+    return validos
+
+def criar_analises_lote(itens, tudo_ou_nada=False):
+    """
+    Insere um lote de análises: pontos e parâmetros resolvidos com uma
+    consulta cada, resultado e próxima coleta calculados em memória e
+    um bulk_create numa transação. Linhas inválidas, repetidas no lote
+    ou com chave (ponto, parâmetro, data) já gravada voltam em "erros"
+    (por índice); com tudo_ou_nada nada é gravado se houver erro.
+    """
+    hoje = timezone.localdate()
+    for item in itens:
+        item.setdefault("data_da_coleta", hoje)
+
+    resolvidos, erros = _resolver_lote(itens)
+    validos = _sem_repetidas(resolvidos, erros)
+
+    existentes = _existentes(validos) if validos else {}
+    analises = []
+    for indice, item, ponto, parametro in validos:
+        if (ponto.id, parametro.id, item["data_da_coleta"]) in existentes:
+            erros.append({"indice": indice, "erro": "Análise já cadastrada para ponto, parâmetro e data"})
+        else:
+            analises.append(_nova_analise(item, ponto, parametro))
+    erros.sort(key=lambda erro: erro["indice"])
+
+    if not analises or (erros and tudo_ou_nada):
+        return {"criadas": 0, "ids": [], "erros": erros}
+
+    with transaction.atomic():
+        # bulk_create não dispara sinais: resumos, séries e versão à mão
+        WaterAnalysis.objects.bulk_create(analises, batch_size=1000)
+        compliance_service.registrar_lote(analises)
+        rollup_service.marcar_meses([analise.data_da_coleta for analise in analises])
+        data_version_service.incrementar("wateranalysis")
+
+    return {"criadas": len(analises), "ids": [analise.id for analise in analises], "erros": erros}
+
+# -------------------------------------------------
+# upsert pela chave natural
+# -------------------------------------------------
+
+CHAVE_NATURAL = ("ponto", "parametro", "data_da_coleta")
+CAMPOS_UPSERT = ("valor", "resultado", "data_da_proxima_coleta")
+
+def _existentes(validos):
+    """Análises já gravadas com a chave de algum item, em uma consulta."""
+    analises = WaterAnalysis.objects.filter(
+        ponto_id__in={ponto.id for _, _, ponto, _ in validos},
+        parametro_id__in={parametro.id for _, _, _, parametro in validos},
+        data_da_coleta__in={item["data_da_coleta"] for _, item, _, _ in validos},
+    )
+    return {(a.ponto_id, a.parametro_id, a.data_da_coleta): a for a in analises}
+
+def upsert_analises(itens, tudo_ou_nada=False):
+    """
+    Insere ou corrige análises pela chave natural (ponto, parâmetro,
+    data da coleta) com INSERT ... ON CONFLICT DO UPDATE, um comando
+    por bloco de 1000 linhas.
+
+    Linhas iguais ao que está gravado ficam de fora e o SET leva só as
+    colunas que mudaram em alguma linha. Parâmetro e data fazem parte
+    da chave, então a próxima coleta de uma análise existente só muda
+    se vier no item.
+    """
+    hoje = timezone.localdate()
+    for item in itens:
+        item.setdefault("data_da_coleta", hoje)
+
+    resolvidos, erros = _resolver_lote(itens)
+
+    # o mesmo ON CONFLICT não pode tocar uma linha duas vezes
+    validos = _sem_repetidas(resolvidos, erros)
+    erros.sort(key=lambda erro: erro["indice"])
+
+    if not validos or (erros and tudo_ou_nada):
+        return {"criadas": 0, "atualizadas": 0, "inalteradas": 0, "ids": [], "erros": erros}
+
+    existentes = _existentes(validos)
+
+    novas, alteradas, anteriores, ids = [], [], [], []
+    campos = set()
+    for _, item, ponto, parametro in validos:
+        analise = existentes.get((ponto.id, parametro.id, item["data_da_coleta"]))
+
+        if analise is None:
+            analise = _nova_analise(item, ponto, parametro)
+            novas.append(analise)
+            ids.append(analise.id)
+            continue
+
+        analise.ponto, analise.parametro = ponto, parametro
+        valores = {
+            "valor": item["valor"],
+            "resultado": item.get("resultado") or parametro.avaliar(item["valor"]),
+            "data_da_proxima_coleta": item.get("data_da_proxima_coleta") or analise.data_da_proxima_coleta,
+        }
+        mudaram = {campo for campo, valor in valores.items() if getattr(analise, campo) != valor}
+
+        if mudaram:
+            anteriores.append(compliance_service.contribuicao(analise))
+            for campo in mudaram:
+                setattr(analise, campo, valores[campo])
+            alteradas.append(analise)
+            campos |= mudaram
+        ids.append(analise.id)
+
+    gravar = novas + alteradas
+    if gravar:
+        with transaction.atomic():
+            WaterAnalysis.objects.bulk_create(
+                gravar,
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=list(CHAVE_NATURAL),
+                update_fields=[c for c in CAMPOS_UPSERT if c in campos] or list(CAMPOS_UPSERT),
+            )
+            # bulk_create não dispara sinais: resumos, séries e versão à mão
+            compliance_service.registrar_lote(gravar, hoje, anteriores=anteriores)
+            rollup_service.marcar_meses([analise.data_da_coleta for analise in gravar])
+            data_version_service.incrementar("wateranalysis")
+
+    return {
+        "criadas": len(novas),
+        "atualizadas": len(alteradas),
+        "inalteradas": len(validos) - len(gravar),
+        "ids": ids,
+        "erros": erros,
+    }
+
+@transaction.atomic
 def atualizar_analise(analise_id, data):
-    analise = WaterAnalysis.objects.get(id=analise_id)
+    analise = WaterAnalysis.objects.select_related("ponto").get(id=analise_id)
+    anterior = compliance_service.contribuicao(analise)
+    coleta_anterior, parametro_anterior = analise.data_da_coleta, analise.parametro_id
     for key, value in data.items():
-        setattr(analise, key, value)
+        if key == "parametro":
+            analise.parametro = parameters_service.obter_parametro(value)
+        elif key == "ponto":
+            analise.ponto_id = value
+        else:
+            setattr(analise, key, value)
+    mudou_prazo = (analise.data_da_coleta, analise.parametro_id) != (coleta_anterior, parametro_anterior)
+    if mudou_prazo and "data_da_proxima_coleta" not in data:
+        # save() recalcula a próxima coleta pela nova data/periodicidade
+        analise.data_da_proxima_coleta = None
     analise.save()
+    rollup_service.marcar_meses([coleta_anterior])
+    compliance_service.substituir_analise(anterior, analise)
     return analise
 
+@transaction.atomic
 def deletar_analise(analise_id):
-    analise = WaterAnalysis.objects.get(id=analise_id)
+    analise = WaterAnalysis.objects.select_related("ponto").get(id=analise_id)
+    compliance_service.remover_analise(compliance_service.contribuicao(analise))
     analise.delete()
     return {"message": f"Análise {analise_id} deletada com sucesso."}
@@ -27,8 +27,8 @@ def validar_telefone(telefone: str):
 
 def listar_clinicas(ids: Optional[List[str]] = None):
     if ids:
-        return list(Clinics.objects.filter(id__in=ids))
-    return list(Clinics.objects.all())
+        return Clinics.objects.filter(id__in=ids)
+    return Clinics.objects.all()
 
 
 def criar_clinica(data: ClinicSchema):
@@ -74,4 +74,4 @@ def deletar_clinica(clinic_id: str) -> bool:
     return deleted > 0
 
 def listar_pontos_clinica(clinic_id: str):
-    return Point.objects.filter(clinica=clinic_id)
+    return Point.objects.select_related("clinica").filter(clinica=clinic_id)
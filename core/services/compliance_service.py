@@ -0,0 +1,297 @@
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Now
+from django.utils import timezone
+
+from core.models import (
+    AnalysisResult,
+    ClinicComplianceSummary,
+    PointComplianceSummary,
+    WaterAnalysis,
+)
+
+
+# =================================================
+# ===== DELTAS ====================================
+# =================================================
+# Cada análise contribui com (total=1, atrasada, reprovada) para o
+# resumo do seu ponto e da clínica do ponto. As escritas em análises
+# aplicam a diferença com UPDATE ... SET x = x + delta, sem recontar.
+
+def contribuicao(analise):
+    """Chave da contribuição de uma análise, lida antes de alterá-la."""
+    return (
+        analise.ponto_id,
+        analise.ponto.clinica_id,
+        analise.data_da_proxima_coleta,
+        analise.resultado == AnalysisResult.REJEITADO,
+    )
+
+
+def _aplicar(model, filtro, proxima, reprovada, sinal):
+    # atrasada é avaliada contra a referencia da própria linha
+    if proxima is None:
+        atrasada = Value(0)
+    else:
+        atrasada = Case(
+            When(referencia__gt=proxima, then=Value(sinal)),
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+
+    def atualizar():
+        return model.objects.filter(**filtro).update(
+            total=F("total") + sinal,
+            reprovadas=F("reprovadas") + (sinal if reprovada else 0),
+            atrasadas=F("atrasadas") + atrasada,
+            atualizado_em=Now(),
+        )
+
+    if not atualizar() and sinal > 0:
+        # sem linha, um delta negativo não tem o que descontar: criar e
+        # decrementar deixaria total=-1 até a reconstrução
+        model.objects.bulk_create([model(**filtro)], ignore_conflicts=True)
+        atualizar()
+
+
+def aplicar_delta(contribuicao, sinal):
+    ponto_id, clinica_id, proxima, reprovada = contribuicao
+
+    _aplicar(PointComplianceSummary, {"ponto_id": ponto_id}, proxima, reprovada, sinal)
+    if clinica_id is not None:
+        _aplicar(ClinicComplianceSummary, {"clinica_id": clinica_id}, proxima, reprovada, sinal)
+
+
+def registrar_analise(analise):
+    aplicar_delta(contribuicao(analise), +1)
+
+
+def remover_analise(contribuicao):
+    aplicar_delta(contribuicao, -1)
+
+
+def registrar_lote(analises, hoje=None, anteriores=()):
+    """
+    Deltas de um lote gravado com bulk_create (sem sinais): soma as
+    contribuições por ponto e por clínica e aplica um UPDATE por chave.
+    anteriores são as contribuições das linhas sobrescritas (upsert),
+    descontadas no mesmo UPDATE.
+    """
+    hoje = hoje or timezone.localdate()
+
+    # com a varredura em dia, toda linha tem referencia == hoje
+    varrer_atrasadas(hoje)
+
+    contribuicoes = [(contribuicao(analise), +1) for analise in analises]
+    contribuicoes += [(anterior, -1) for anterior in anteriores]
+
+    deltas = {}
+    for (ponto_id, clinica_id, proxima, reprovada), sinal in contribuicoes:
+        delta = (sinal, sinal * int(proxima is not None and proxima < hoje), sinal * int(reprovada))
+        for chave in (("ponto_id", ponto_id), ("clinica_id", clinica_id)):
+            if chave[1] is not None:
+                anterior = deltas.get(chave, (0, 0, 0))
+                deltas[chave] = tuple(a + d for a, d in zip(anterior, delta))
+
+    modelos = {"ponto_id": PointComplianceSummary, "clinica_id": ClinicComplianceSummary}
+
+    # linhas que ainda não existem, de uma vez; só para quem ganha
+    # análises (descontos sem linha não têm o que descontar)
+    for campo, model in modelos.items():
+        model.objects.bulk_create(
+            [
+                model(**{campo: chave_id}, referencia=hoje)
+                for (c, chave_id), (total, _, _) in deltas.items()
+                if c == campo and total > 0
+            ],
+            ignore_conflicts=True,
+        )
+
+    for (campo, chave_id), (total, atrasadas, reprovadas) in deltas.items():
+        if not (total or atrasadas or reprovadas):
+            continue
+        modelos[campo].objects.filter(**{campo: chave_id}).update(
+            total=F("total") + total,
+            atrasadas=F("atrasadas") + atrasadas,
+            reprovadas=F("reprovadas") + reprovadas,
+            atualizado_em=Now(),
+        )
+
+
+def substituir_analise(anterior, analise):
+    nova = contribuicao(analise)
+    if nova != anterior:
+        aplicar_delta(anterior, -1)
+        aplicar_delta(nova, +1)
+
+
+# -------------------------------------------------
+# pontos
+# -------------------------------------------------
+
+def mover_ponto(ponto_id, clinica_anterior, clinica_nova):
+    """Transfere os contadores de um ponto que trocou de clínica."""
+    if clinica_anterior == clinica_nova:
+        return
+
+    resumo = PointComplianceSummary.objects.filter(ponto_id=ponto_id).first()
+    if resumo is None:
+        return
+
+    for clinica_id, sinal in ((clinica_anterior, -1), (clinica_nova, +1)):
+        if clinica_id is None:
+            continue
+        filtro = {"clinica_id": clinica_id}
+        if not ClinicComplianceSummary.objects.filter(**filtro).exists():
+            ClinicComplianceSummary.objects.bulk_create(
+                [ClinicComplianceSummary(**filtro, referencia=resumo.referencia)],
+                ignore_conflicts=True,
+            )
+        ClinicComplianceSummary.objects.filter(**filtro).update(
+            total=F("total") + sinal * resumo.total,
+            reprovadas=F("reprovadas") + sinal * resumo.reprovadas,
+            atrasadas=F("atrasadas") + sinal * resumo.atrasadas,
+            atualizado_em=Now(),
+        )
+
+
+def remover_ponto(ponto):
+    """Desconta da clínica as análises de um ponto prestes a ser apagado."""
+    mover_ponto(ponto.id, ponto.clinica_id, None)
+
+
+# =================================================
+# ===== VARREDURA DIÁRIA ==========================
+# =================================================
+
+def _atrasadas_na_janela(campo, hoje):
+    # análises que venceram entre a referencia da linha e hoje
+    return Coalesce(
+        Subquery(
+            WaterAnalysis.objects
+            .filter(
+                **{campo: OuterRef("pk")},
+                data_da_proxima_coleta__gte=OuterRef("referencia"),
+                data_da_proxima_coleta__lt=hoje,
+            )
+            .order_by()
+            .values(campo)
+            .annotate(n=Count("id"))
+            .values("n")
+        ),
+        0,
+    )
+
+
+def varrer_atrasadas(hoje=None):
+    """
+    Move para "atrasadas" as análises cuja próxima coleta passou desde
+    a última varredura. Um UPDATE por tabela; não faz nada se a
+    referencia já é hoje.
+    """
+    hoje = hoje or timezone.localdate()
+    atualizados = 0
+
+    with transaction.atomic():
+        for model, campo in (
+            (PointComplianceSummary, "ponto"),
+            (ClinicComplianceSummary, "ponto__clinica"),
+        ):
+            atualizados += (
+                model.objects
+                .filter(referencia__lt=hoje)
+                .update(
+                    atrasadas=F("atrasadas") + _atrasadas_na_janela(campo, hoje),
+                    referencia=hoje,
+                    atualizado_em=Now(),
+                )
+            )
+
+    return atualizados
+
+
+# =================================================
+# ===== RECONSTRUÇÃO ==============================
+# =================================================
+
+def _contagens(campo, hoje):
+    return {
+        linha[campo]: (linha["total"], linha["atrasadas"], linha["reprovadas"])
+        for linha in WaterAnalysis.objects
+        .filter(**{f"{campo}__isnull": False})
+        .values(campo)
+        .annotate(
+            total=Count("id"),
+            atrasadas=Count("id", filter=Q(data_da_proxima_coleta__lt=hoje)),
+            reprovadas=Count("id", filter=Q(resultado=AnalysisResult.REJEITADO)),
+        )
+        .order_by()
+    }
+
+
+def _atuais(model, chave):
+    return {
+        getattr(r, chave): (r.total, r.atrasadas, r.reprovadas)
+        for r in model.objects.all()
+    }
+
+
+def reconstruir(hoje=None, somente_verificar=False):
+    """
+    Recalcula os resumos a partir de WaterAnalysis e compara com o que
+    está gravado. Retorna {"pontos": divergências, "clinicas": ...};
+    com somente_verificar=False regrava as tabelas.
+    """
+    hoje = hoje or timezone.localdate()
+
+    # varre antes para que gravado e recalculado usem a mesma referencia
+    varrer_atrasadas(hoje)
+
+    divergencias = {}
+
+    with transaction.atomic():
+        for nome, model, chave, campo in (
+            ("pontos", PointComplianceSummary, "ponto_id", "ponto"),
+            ("clinicas", ClinicComplianceSummary, "clinica_id", "ponto__clinica"),
+        ):
+            esperado = _contagens(campo, hoje)
+            atual = _atuais(model, chave)
+
+            divergencias[nome] = [
+                {"id": str(chave_id), "esperado": esperado.get(chave_id), "atual": atual.get(chave_id)}
+                for chave_id in esperado.keys() | atual.keys()
+                if esperado.get(chave_id, (0, 0, 0)) != atual.get(chave_id, (0, 0, 0))
+            ]
+
+            if somente_verificar:
+                continue
+
+            model.objects.all().delete()
+            model.objects.bulk_create(
+                [
+                    model(
+                        **{chave: chave_id},
+                        total=total,
+                        atrasadas=atrasadas,
+                        reprovadas=reprovadas,
+                        referencia=hoje,
+                    )
+                    for chave_id, (total, atrasadas, reprovadas) in esperado.items()
+                ],
+                batch_size=5000,
+            )
+
+    return divergencias
+
+
+# =================================================
+# ===== LEITURA ===================================
+# =================================================
+
+def totais():
+    """Totais gerais somando os resumos por ponto (O(pontos))."""
+    return PointComplianceSummary.objects.aggregate(
+        total=Coalesce(Sum("total"), 0),
+        atrasadas=Coalesce(Sum("atrasadas"), 0),
+        reprovadas=Coalesce(Sum("reprovadas"), 0),
+    )
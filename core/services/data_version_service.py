@@ -0,0 +1,73 @@
+import hashlib
+import uuid
+from django.db.models import F
+from django.db.models.functions import Now
+from django.utils import timezone
+
+from core.models import DataVersion
+
+
+# Tabelas que alimentam relatórios e gráficos
+TABELAS = ("clinics", "point", "wateranalysis", "waterparameter")
+
+
+def incrementar(tabela):
+    atualizados = DataVersion.objects.filter(tabela=tabela).update(
+        versao=F("versao") + 1, marca=uuid.uuid4(), atualizado_em=Now()
+    )
+    if not atualizados:
+        DataVersion.objects.bulk_create([DataVersion(tabela=tabela)], ignore_conflicts=True)
+        DataVersion.objects.filter(tabela=tabela).update(
+            versao=F("versao") + 1, marca=uuid.uuid4(), atualizado_em=Now()
+        )
+
+
+def _carimbo(versao, marca):
+    return f"{versao}.{marca.hex[:12]}"
+
+
+def versoes(tabelas=TABELAS):
+    """{tabela: "versão.marca"}; "0" para tabela sem escritas."""
+    atuais = {
+        tabela: _carimbo(versao, marca)
+        for tabela, versao, marca
+        in DataVersion.objects.filter(tabela__in=tabelas).values_list("tabela", "versao", "marca")
+    }
+    return {tabela: atuais.get(tabela, "0") for tabela in tabelas}
+
+
+async def aversoes(tabelas=TABELAS):
+    atuais = {
+        tabela: _carimbo(versao, marca)
+        async for tabela, versao, marca
+        in DataVersion.objects.filter(tabela__in=tabelas).values_list("tabela", "versao", "marca")
+    }
+    return {tabela: atuais.get(tabela, "0") for tabela in tabelas}
+
+
+def _chave(atuais, hoje=None):
+    bruto = "|".join(f"{t}={v}" for t, v in atuais.items())
+    if hoje is not None:
+        bruto = f"{hoje.isoformat()}|{bruto}"
+    return hashlib.sha1(bruto.encode()).hexdigest()[:16]
+
+
+def versao_dados(tabelas=TABELAS, hoje=None):
+    """
+    Chave curta da versão dos dados: contadores das tabelas + data de
+    hoje (o status "atrasada" muda com a data mesmo sem escritas).
+    """
+    return _chave(versoes(tabelas), hoje or timezone.localdate())
+
+
+async def aversao_dados(tabelas=TABELAS, hoje=None):
+    return _chave(await aversoes(tabelas), hoje or timezone.localdate())
+
+
+def versao_tabelas(tabelas):
+    """Como versao_dados, sem a data: para dados que não mudam com o dia."""
+    return _chave(versoes(tabelas))
+
+
+async def aversao_tabelas(tabelas):
+    return _chave(await aversoes(tabelas))
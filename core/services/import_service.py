@@ -0,0 +1,307 @@
+import csv
+import io
+import math
+import time
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from itertools import chain, islice
+from pathlib import Path
+from django.db import connection, transaction
+
+from core.models import DIAS_PERIODICIDADE, AnalysisResult, Point, WaterAnalysis
+from core.services import compliance_service, data_version_service, parameters_service, rollup_service
+
+
+# =================================================
+# ===== IMPORTAÇÃO DE HISTÓRICO ===================
+# =================================================
+# O arquivo (CSV ou XLSX) é lido em fluxo e validado em blocos contra
+# mapas em memória (nome → id). Cada bloco vai por COPY para uma tabela
+# temporária; no fim, um único INSERT ... SELECT leva tudo para
+# WaterAnalysis pela chave natural (ponto, parâmetro, data da coleta).
+
+BLOCO = 20000
+
+COLUNAS = ("clinica", "ponto", "parametro", "valor", "data_da_coleta", "resultado", "data_da_proxima_coleta")
+OBRIGATORIAS = ("ponto", "parametro", "valor", "data_da_coleta")
+
+FORMATOS_DATA = ("%Y-%m-%d", "%d/%m/%Y", "%d/%m/%y")
+
+TABELA_TEMPORARIA = "importacao_analises"
+
+AMBIGUO = object()
+
+
+def _normalizar(texto):
+    return str(texto if texto is not None else "").strip().casefold()
+
+
+# -------------------------------------------------
+# leitura
+# -------------------------------------------------
+
+def _linhas_csv(caminho):
+    with open(caminho, newline="", encoding="utf-8-sig") as arquivo:
+        cabecalho = arquivo.readline()
+        arquivo.seek(0)
+        # exportações do Excel em pt-BR usam ";" (e vírgula decimal)
+        delimitador = ";" if cabecalho.count(";") > cabecalho.count(",") else ","
+        leitor = csv.reader(arquivo, delimiter=delimitador)
+        colunas = [_normalizar(c) for c in next(leitor, [])]
+        for valores in leitor:
+            yield dict(zip(colunas, valores))
+
+
+def _linhas_xlsx(caminho):
+    from openpyxl import load_workbook
+
+    livro = load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        linhas = livro.active.iter_rows(values_only=True)
+        colunas = [_normalizar(c) for c in next(linhas, ())]
+        for valores in linhas:
+            if any(v is not None for v in valores):
+                yield dict(zip(colunas, valores))
+    finally:
+        livro.close()
+
+
+LEITORES = {
+    ".csv": _linhas_csv,
+    ".txt": _linhas_csv,
+    ".xlsx": _linhas_xlsx,
+}
+
+
+def ler_linhas(caminho):
+    """Gerador de dicionários {coluna: valor}, uma linha por vez."""
+    extensao = Path(caminho).suffix.lower()
+    if extensao not in LEITORES:
+        raise ValueError(f"Formato não suportado: {extensao} (use {', '.join(LEITORES)})")
+    return LEITORES[extensao](caminho)
+
+
+# -------------------------------------------------
+# mapas nome → id
+# -------------------------------------------------
+
+def _registrar(mapa, chave, valor):
+    # nomes repetidos viram AMBIGUO; o arquivo precisa desambiguar
+    mapa[chave] = valor if mapa.get(chave, valor) == valor else AMBIGUO
+
+
+def _mapa_pontos():
+    """(por nome ou id, por (clínica, nome)); clínica por nome ou CNPJ."""
+    pontos, pontos_clinica = {}, {}
+    for ponto_id, nome, clinica, cnpj in Point.objects.values_list(
+        "id", "nome", "clinica__nome", "clinica__cnpj"
+    ):
+        nome = _normalizar(nome)
+        pontos[str(ponto_id)] = ponto_id
+        _registrar(pontos, nome, ponto_id)
+        for chave in (clinica, cnpj):
+            if chave:
+                _registrar(pontos_clinica, (_normalizar(chave), nome), ponto_id)
+    return pontos, pontos_clinica
+
+
+def _mapa_parametros():
+    parametros = {}
+    for parametro in parameters_service.registro().values():
+        parametros[str(parametro.id)] = parametro
+        parametros[_normalizar(parametro.nome)] = parametro
+    return parametros
+
+
+# -------------------------------------------------
+# validação
+# -------------------------------------------------
+
+@lru_cache(maxsize=4096)
+def _data_texto(texto):
+    # históricos repetem poucas datas; strptime é o passo mais caro
+    for formato in FORMATOS_DATA:
+        try:
+            return datetime.strptime(texto, formato).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _data(valor, coluna):
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    texto = str(valor).strip()
+    dia = _data_texto(texto)
+    if dia is None:
+        raise ValueError(f"{coluna} inválida: '{texto}'")
+    return dia
+
+
+def _numero(valor):
+    if isinstance(valor, (int, float)):
+        numero = float(valor)
+    else:
+        try:
+            numero = float(str(valor).strip().replace(",", "."))
+        except ValueError:
+            raise ValueError(f"valor inválido: '{valor}'") from None
+    if not math.isfinite(numero):
+        raise ValueError("valor deve ser um número finito")
+    return numero
+
+
+def _validar(linha, pontos, pontos_clinica, parametros):
+    """Linha do arquivo → colunas da tabela temporária (ou ValueError)."""
+    faltando = [c for c in OBRIGATORIAS if linha.get(c) in (None, "")]
+    if faltando:
+        raise ValueError(f"Colunas vazias: {', '.join(faltando)}")
+
+    nome_ponto = _normalizar(linha["ponto"])
+    clinica = _normalizar(linha.get("clinica"))
+    if clinica:
+        ponto_id = pontos_clinica.get((clinica, nome_ponto))
+    else:
+        ponto_id = pontos.get(nome_ponto)
+    if ponto_id is AMBIGUO:
+        raise ValueError(f"Ponto '{linha['ponto']}' ambíguo; informe a clínica")
+    if ponto_id is None:
+        raise ValueError(f"Ponto '{linha['ponto']}' não encontrado")
+
+    parametro = parametros.get(_normalizar(linha["parametro"]))
+    if parametro is None:
+        raise ValueError(f"Parâmetro '{linha['parametro']}' não encontrado")
+
+    valor = _numero(linha["valor"])
+    coleta = _data(linha["data_da_coleta"], "data_da_coleta")
+
+    resultado = str(linha.get("resultado") or "").strip().upper()
+    if not resultado:
+        resultado = parametro.avaliar(valor)
+    elif resultado not in AnalysisResult.values:
+        raise ValueError(f"resultado inválido: '{linha['resultado']}'")
+
+    if linha.get("data_da_proxima_coleta"):
+        proxima = _data(linha["data_da_proxima_coleta"], "data_da_proxima_coleta")
+    else:
+        dias = DIAS_PERIODICIDADE.get(parametro.periodicidade)
+        proxima = coleta + timedelta(days=dias) if dias is not None else None
+
+    return ponto_id, parametro.id, valor, resultado, coleta, proxima
+
+
+def _copy(valores):
+    # formato texto do COPY: tabulação entre colunas, \N para nulo
+    return "\t".join(r"\N" if v is None else str(v) for v in valores) + "\n"
+
+
+# -------------------------------------------------
+# carga
+# -------------------------------------------------
+
+def _sql_merge(atualizar):
+    tabela = WaterAnalysis._meta.db_table
+    conflito = (
+        "DO UPDATE SET valor = EXCLUDED.valor, resultado = EXCLUDED.resultado, "
+        "data_da_proxima_coleta = EXCLUDED.data_da_proxima_coleta"
+        if atualizar else "DO NOTHING"
+    )
+    # chave repetida no arquivo: vale a última linha
+    return f"""
+        INSERT INTO {tabela}
+            (id, ponto_id, parametro_id, valor, resultado, data_da_coleta, data_da_proxima_coleta)
+        SELECT gen_random_uuid(), ponto_id, parametro_id, valor, resultado, data_da_coleta, data_da_proxima_coleta
+        FROM (
+            SELECT DISTINCT ON (ponto_id, parametro_id, data_da_coleta) *
+            FROM {TABELA_TEMPORARIA}
+            ORDER BY ponto_id, parametro_id, data_da_coleta, linha DESC
+        ) AS ultimas
+        ON CONFLICT (ponto_id, parametro_id, data_da_coleta) {conflito}
+    """
+
+
+def importar(caminho, rejeitos, atualizar=False, bloco=BLOCO, progresso=None):
+    """
+    Importa análises de um CSV/XLSX com colunas clinica (opcional),
+    ponto, parametro, valor, data_da_coleta e, opcionais, resultado e
+    data_da_proxima_coleta. Linhas inválidas vão para o CSV rejeitos
+    com o número da linha e o erro.
+
+    Chaves já gravadas são puladas, ou sobrescritas com atualizar=True.
+    progresso(lidas, rejeitadas, segundos) é chamado a cada bloco.
+    Retorna {"lidas", "rejeitadas", "gravadas", "segundos"}.
+    """
+    inicio = time.perf_counter()
+
+    linhas = ler_linhas(caminho)
+    primeira = next(linhas, None)
+    if primeira is None:
+        raise ValueError("Arquivo sem linhas")
+    ausentes = [c for c in OBRIGATORIAS if c not in primeira]
+    if ausentes:
+        raise ValueError(f"Colunas obrigatórias ausentes: {', '.join(ausentes)}")
+
+    pontos, pontos_clinica = _mapa_pontos()
+    parametros = _mapa_parametros()
+
+    lidas = rejeitadas = 0
+    numeradas = enumerate(chain([primeira], linhas), start=2)  # linha 1 é o cabeçalho
+
+    with (
+        open(rejeitos, "w", newline="", encoding="utf-8") as arquivo_rejeitos,
+        transaction.atomic(),
+        connection.cursor() as cursor,
+    ):
+        gravador = csv.writer(arquivo_rejeitos)
+        gravador.writerow(["linha", "erro", *COLUNAS])
+
+        cursor.execute(f"""
+            CREATE TEMPORARY TABLE {TABELA_TEMPORARIA} (
+                linha integer,
+                ponto_id uuid,
+                parametro_id uuid,
+                valor double precision,
+                resultado varchar(15),
+                data_da_coleta date,
+                data_da_proxima_coleta date
+            ) ON COMMIT DROP
+        """)
+
+        while lote := list(islice(numeradas, bloco)):
+            buffer = io.StringIO()
+            for numero, linha in lote:
+                try:
+                    valores = _validar(linha, pontos, pontos_clinica, parametros)
+                except ValueError as erro:
+                    rejeitadas += 1
+                    gravador.writerow([numero, erro, *(linha.get(c, "") for c in COLUNAS)])
+                else:
+                    buffer.write(_copy((numero, *valores)))
+
+            buffer.seek(0)
+            cursor.copy_expert(f"COPY {TABELA_TEMPORARIA} FROM STDIN", buffer)
+
+            lidas += len(lote)
+            if progresso:
+                progresso(lidas, rejeitadas, time.perf_counter() - inicio)
+
+        cursor.execute(_sql_merge(atualizar))
+        gravadas = cursor.rowcount
+
+        if gravadas:
+            cursor.execute(
+                f"SELECT DISTINCT date_trunc('month', data_da_coleta)::date FROM {TABELA_TEMPORARIA}"
+            )
+            # COPY e INSERT ... SELECT não passam pelos sinais
+            rollup_service.marcar_meses([mes for (mes,) in cursor.fetchall()])
+            data_version_service.incrementar("wateranalysis")
+            compliance_service.reconstruir()
+
+    return {
+        "lidas": lidas,
+        "rejeitadas": rejeitadas,
+        "gravadas": gravadas,
+        "segundos": time.perf_counter() - inicio,
+    }
@@ -1,4 +1,9 @@
+import threading
+import time
+from uuid import UUID
+from django.conf import settings
 from core.models import WaterParameter
+from core.services import data_version_service
 from typing import List, Optional
 
 def listar_parametros(ids: Optional[List[str]] = None):
@@ -20,3 +25,68 @@ def deletar_parametro(parametro_id):
     parametro = WaterParameter.objects.get(id=parametro_id)
     parametro.delete()
     return {"message": f"Parâmetro {parametro_id} deletado com sucesso."}
+
+
+# =================================================
+# ===== REGISTRO EM MEMÓRIA =======================
+# =================================================
+# Tabela pequena e quase estática: cada processo carrega os parâmetros
+# uma vez e só recarrega quando muda a versão "waterparameter" de
+# DataVersion (incrementada pelos sinais em save/delete, em qualquer
+# worker). A versão inclui a marca aleatória do incremento, então um
+# rollback nunca volta a uma versão já carregada. Ela é lida no máximo
+# a cada PARAMETROS_REVALIDAR_SEGUNDOS; escritas no próprio processo
+# invalidam na hora e de novo no commit. As instâncias são
+# compartilhadas: só leitura.
+
+_VAZIO = {"versao": None, "verificado_em": float("-inf"), "parametros": {}}
+
+_registro = dict(_VAZIO)
+_lock = threading.Lock()
+
+def invalidar_registro():
+    _registro["verificado_em"] = float("-inf")
+
+def limpar_registro():
+    """Esquece os parâmetros carregados (testes, troca de banco)."""
+    with _lock:
+        _registro.update(_VAZIO)
+
+def registro():
+    """{id: WaterParameter} do processo, revalidado pela versão."""
+    agora = time.monotonic()
+    if agora - _registro["verificado_em"] < settings.PARAMETROS_REVALIDAR_SEGUNDOS:
+        return _registro["parametros"]
+
+    with _lock:
+        # versão lida antes da carga: uma escrita no meio só causa
+        # uma recarga a mais, nunca dados velhos com versão nova
+        versao = data_version_service.versoes(("waterparameter",))["waterparameter"]
+        if versao != _registro["versao"]:
+            _registro["parametros"] = {p.id: p for p in WaterParameter.objects.all()}
+            _registro["versao"] = versao
+        _registro["verificado_em"] = agora
+
+    return _registro["parametros"]
+
+def _uuid(parametro_id):
+    try:
+        return parametro_id if isinstance(parametro_id, UUID) else UUID(str(parametro_id))
+    except ValueError:
+        return None
+
+def parametros_em_lote(ids):
+    """Como in_bulk: {id pedido: WaterParameter}, sem os inexistentes."""
+    parametros = registro()
+    if any(_uuid(i) not in parametros for i in ids):
+        # criado há pouco em outro worker: revalida uma vez
+        invalidar_registro()
+        parametros = registro()
+    return {i: parametros[_uuid(i)] for i in ids if _uuid(i) in parametros}
+
+def obter_parametro(parametro_id):
+    """WaterParameter do registro; DoesNotExist se não existe."""
+    encontrados = parametros_em_lote([parametro_id])
+    if not encontrados:
+        raise WaterParameter.DoesNotExist(f"Parâmetro {parametro_id} não encontrado")
+    return encontrados[parametro_id]
@@ -1,13 +1,16 @@
+from django.db import transaction
 from core.models import Point, Clinics
+from core.services import compliance_service, rollup_service
 from core.schemas import PointSchema
 from typing import List, Optional
 from django.core.exceptions import ValidationError
 
 def listar_pontos(ids: Optional[List[str]] = None):
+    # PointSchema embute a clínica: um JOIN em vez de uma consulta por ponto
+    pontos = Point.objects.select_related("clinica")
     if ids:
-        pontos = Point.objects.filter(id__in=ids)
-        return [PointSchema.model_validate(p) for p in pontos]
-    return Point.objects.all()
+        return pontos.filter(id__in=ids)
+    return pontos
 
 def criar_ponto(data):
     tipo = data.get("tipo")
@@ -25,14 +28,21 @@ def criar_ponto(data):
     ponto = Point.objects.create(**data)
     return PointSchema.model_validate(ponto)
 
+@transaction.atomic
 def atualizar_ponto(point_id, data):
     ponto = Point.objects.get(id=point_id)
+    clinica_anterior, tipo_anterior = ponto.clinica_id, ponto.tipo
     for key, value in data.items():
         setattr(ponto, key, value)
     ponto.save()
+    compliance_service.mover_ponto(ponto.id, clinica_anterior, ponto.clinica_id)
+    if (clinica_anterior, tipo_anterior) != (ponto.clinica_id, ponto.tipo):
+        rollup_service.marcar_ponto(ponto.id)
     return ponto
 
+@transaction.atomic
 def deletar_ponto(point_id):
     ponto = Point.objects.get(id=point_id)
+    compliance_service.remover_ponto(ponto)
     ponto.delete()
     return {"message": f"Ponto {point_id} deletado com sucesso."}
@@ -0,0 +1,219 @@
+from datetime import date, datetime, timedelta
+from django.db import transaction
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Max, Min, Q, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+
+from core.models import (
+    AnalysisResult,
+    AnalysisRollup,
+    RollupGranularity,
+    RollupPendente,
+    WaterAnalysis,
+)
+from core.services import data_version_service
+
+
+# =================================================
+# ===== MESES PENDENTES ===========================
+# =================================================
+# Escritas em análises marcam o mês da coleta como pendente; a
+# atualização recalcula só esses meses (e as semanas que os cruzam).
+# Mínimo e máximo não se mantêm por delta em exclusões, por isso o
+# recálculo é por balde e não por incremento.
+
+def _inicio_mes(dia):
+    return dia.replace(day=1)
+
+
+def _proximo_mes(dia):
+    return (dia.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def marcar_meses(dias):
+    meses = {
+        # data_da_coleta recém-criada ainda é o datetime do default
+        _inicio_mes(timezone.localdate(dia) if isinstance(dia, datetime) else dia)
+        for dia in dias
+        if dia is not None
+    }
+    if meses:
+        RollupPendente.objects.bulk_create(
+            [RollupPendente(mes=mes) for mes in meses], ignore_conflicts=True
+        )
+
+
+def marcar_ponto(ponto_id):
+    """Todos os meses com análises do ponto (trocou de clínica ou tipo)."""
+    meses = (
+        WaterAnalysis.objects
+        .filter(ponto_id=ponto_id)
+        .annotate(mes=TruncMonth("data_da_coleta"))
+        .values_list("mes", flat=True)
+        .distinct()
+    )
+    marcar_meses(list(meses))
+
+
+# =================================================
+# ===== RECÁLCULO =================================
+# =================================================
+
+def _baldes(analyses, granularidade, truncar, hoje):
+    linhas = (
+        analyses
+        .annotate(inicio=truncar("data_da_coleta"))
+        .values("inicio", "parametro_id", clinica_id=F("ponto__clinica_id"), tipo_ponto=F("ponto__tipo"))
+        .annotate(
+            total=Count("id"),
+            reprovadas=Count("id", filter=Q(resultado=AnalysisResult.REJEITADO)),
+            atrasadas=Count("id", filter=Q(data_da_proxima_coleta__lt=hoje)),
+            soma_valor=Sum("valor"),
+            min_valor=Min("valor"),
+            max_valor=Max("valor"),
+        )
+        .order_by()
+    )
+    return [
+        AnalysisRollup(granularidade=granularidade, referencia=hoje, **linha)
+        for linha in linhas
+    ]
+
+
+def _recalcular_mes(mes, hoje):
+    fim = _proximo_mes(mes)
+
+    # semanas (segunda a domingo) que tocam o mês, inteiras
+    semana_inicio = mes - timedelta(days=mes.weekday())
+    semana_fim = fim + timedelta(days=(7 - fim.weekday()) % 7)
+
+    AnalysisRollup.objects.filter(
+        Q(granularidade=RollupGranularity.MES, inicio=mes)
+        | Q(granularidade=RollupGranularity.SEMANA, inicio__gte=semana_inicio, inicio__lt=semana_fim)
+    ).delete()
+
+    baldes = _baldes(
+        WaterAnalysis.objects.filter(data_da_coleta__gte=mes, data_da_coleta__lt=fim),
+        RollupGranularity.MES, TruncMonth, hoje,
+    ) + _baldes(
+        WaterAnalysis.objects.filter(data_da_coleta__gte=semana_inicio, data_da_coleta__lt=semana_fim),
+        RollupGranularity.SEMANA, TruncWeek, hoje,
+    )
+    AnalysisRollup.objects.bulk_create(baldes, batch_size=5000)
+
+
+def atualizar_pendentes(hoje=None):
+    """
+    Recalcula os meses pendentes. Antes, marca os meses com análises
+    que venceram desde a última atualização (o "atrasadas" depende de
+    hoje). Retorna o número de meses recalculados.
+    """
+    hoje = hoje or timezone.localdate()
+
+    ultima = AnalysisRollup.objects.aggregate(ref=Min("referencia"))["ref"]
+    virou_dia = ultima is not None and ultima < hoje
+    if virou_dia:
+        marcar_meses(
+            WaterAnalysis.objects
+            .filter(data_da_proxima_coleta__gte=ultima, data_da_proxima_coleta__lt=hoje)
+            .annotate(mes=TruncMonth("data_da_coleta"))
+            .values_list("mes", flat=True)
+            .distinct()
+        )
+        AnalysisRollup.objects.filter(referencia__lt=hoje).update(referencia=hoje)
+
+    with transaction.atomic():
+        # outra atualização concorrente pega os meses que sobrarem
+        pendentes = list(
+            RollupPendente.objects.select_for_update(skip_locked=True).order_by("mes")
+        )
+        for pendente in pendentes:
+            _recalcular_mes(pendente.mes, hoje)
+        RollupPendente.objects.filter(mes__in=[p.mes for p in pendentes]).delete()
+
+        if pendentes or virou_dia:
+            # ETag e cache de /api/stats/timeseries
+            data_version_service.incrementar("analysisrollup")
+
+    return len(pendentes)
+
+
+def reconstruir(hoje=None):
+    """Apaga os agregados e marca todos os meses com análises."""
+    with transaction.atomic():
+        AnalysisRollup.objects.all().delete()
+        marcar_meses(
+            WaterAnalysis.objects
+            .annotate(mes=TruncMonth("data_da_coleta"))
+            .values_list("mes", flat=True)
+            .distinct()
+        )
+    return atualizar_pendentes(hoje)
+
+
+# =================================================
+# ===== CONSULTA ==================================
+# =================================================
+
+AGRUPAMENTOS = {
+    "clinica": "clinica_id",
+    "tipo_ponto": "tipo_ponto",
+    "parametro": "parametro_id",
+}
+
+METRICAS = {
+    "total": Sum("total"),
+    "reprovadas": Sum("reprovadas"),
+    "atrasadas": Sum("atrasadas"),
+    "media": ExpressionWrapper(Sum("soma_valor") / Sum("total"), output_field=FloatField()),
+    "min": Min("min_valor"),
+    "max": Max("max_valor"),
+}
+
+
+def serie_temporal(
+    periodo="mes",
+    agrupar=(),
+    metricas=("total",),
+    inicio: date = None,
+    fim: date = None,
+    clinica=None,
+    tipo_ponto=None,
+    parametro=None,
+):
+    """
+    Série por período de coleta (mês ou semana), opcionalmente aberta
+    por clínica, tipo de ponto e parâmetro. Lê só AnalysisRollup, como
+    ficou na última atualização (refresh_rollups, no cron); a leitura
+    não recalcula nem trava meses pendentes.
+
+    Por isso a série pode atrasar até um intervalo do cron: escritas
+    feitas depois da última atualização e "atrasadas" que venceram
+    desde então só aparecem na próxima.
+    """
+    granularidade = RollupGranularity.SEMANA if periodo == "semana" else RollupGranularity.MES
+    rollups = AnalysisRollup.objects.filter(granularidade=granularidade)
+
+    if inicio:
+        rollups = rollups.filter(inicio__gte=inicio)
+    if fim:
+        rollups = rollups.filter(inicio__lte=fim)
+    if clinica:
+        rollups = rollups.filter(clinica_id=clinica)
+    if tipo_ponto:
+        rollups = rollups.filter(tipo_ponto=tipo_ponto)
+    if parametro:
+        rollups = rollups.filter(parametro_id=parametro)
+
+    campos = ["inicio"] + [AGRUPAMENTOS[a] for a in agrupar]
+
+    # "media" primeiro: depois da anotação "total", Sum("total") passaria
+    # a se referir a ela e não à coluna
+    metricas = sorted(metricas, key=lambda m: m != "media")
+
+    return list(
+        rollups
+        .values(*campos)
+        .annotate(**{m: METRICAS[m] for m in metricas})
+        .order_by(*campos)
+    )
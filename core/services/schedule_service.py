@@ -0,0 +1,43 @@
+from typing import Optional
+from uuid import UUID
+from core.models import SchedulePlan, ScheduledCollection
+from core.schemas import ScheduleRequestSchema
+
+
+def enfileirar_plano(data: ScheduleRequestSchema):
+    return SchedulePlan.objects.create(parametros=data.model_dump(mode="json"))
+
+async def aenfileirar_plano(data: ScheduleRequestSchema):
+    return await SchedulePlan.objects.acreate(parametros=data.model_dump(mode="json"))
+
+def listar_planos(limite: int = 20):
+    return SchedulePlan.objects.all()[:limite]
+
+async def alistar_planos(limite: int = 20):
+    return [plano async for plano in listar_planos(limite)]
+
+def obter_plano(plano_id):
+    try:
+        return SchedulePlan.objects.get(id=plano_id)
+    except SchedulePlan.DoesNotExist:
+        return None
+
+async def aobter_plano(plano_id):
+    try:
+        return await SchedulePlan.objects.aget(id=plano_id)
+    except SchedulePlan.DoesNotExist:
+        return None
+
+def listar_coletas(plano_id, mes: Optional[str] = None, clinica: Optional[UUID] = None):
+    """
+    Coletas planejadas de um plano, filtradas por mês (AAAA-MM) e/ou
+    clínica. Usam os índices (plano, mes_planejado) e
+    (clinica, mes_planejado).
+    """
+    coletas = ScheduledCollection.objects.filter(plano_id=plano_id)
+    if mes:
+        ano, numero = mes.split("-")
+        coletas = coletas.filter(mes_planejado=f"{ano}-{numero}-01")
+    if clinica:
+        coletas = coletas.filter(clinica_id=clinica)
+    return coletas.order_by("mes_planejado", "id")
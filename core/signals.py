@@ -0,0 +1,35 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import Clinics, Point, WaterAnalysis, WaterParameter
+from core.services import data_version_service, parameters_service, rollup_service
+
+
+@receiver(post_save, sender=Clinics)
+@receiver(post_save, sender=Point)
+@receiver(post_save, sender=WaterAnalysis)
+@receiver(post_save, sender=WaterParameter)
+@receiver(post_delete, sender=Clinics)
+@receiver(post_delete, sender=Point)
+@receiver(post_delete, sender=WaterAnalysis)
+@receiver(post_delete, sender=WaterParameter)
+def incrementar_versao(sender, **kwargs):
+    # QuerySet.update() e bulk_create não disparam sinais: quem usa
+    # esses caminhos chama data_version_service.incrementar() direto.
+    data_version_service.incrementar(sender._meta.model_name)
+
+
+@receiver(post_save, sender=WaterAnalysis)
+@receiver(post_delete, sender=WaterAnalysis)
+def marcar_rollup(sender, instance, **kwargs):
+    rollup_service.marcar_meses([instance.data_da_coleta])
+
+
+@receiver(post_save, sender=WaterParameter)
+@receiver(post_delete, sender=WaterParameter)
+def invalidar_parametros(sender, **kwargs):
+    # na hora para a própria transação; no commit para as leituras que
+    # recarregaram antes dele. Os outros workers percebem pela versão
+    parameters_service.invalidar_registro()
+    transaction.on_commit(parameters_service.invalidar_registro)
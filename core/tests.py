@@ -1,3 +1,477 @@
-from django.test import TestCase
+import json
+from datetime import date, timedelta
+import numpy as np
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
 
-# Create your tests here.
+from core.models import (
+    AnalysisResult,
+    ClinicComplianceSummary,
+    Clinics,
+    Periodicity,
+    Point,
+    PointComplianceSummary,
+    PointType,
+    WaterAnalysis,
+    WaterParameter,
+)
+from core.services import analysis_service, compliance_service, parameters_service
+from core.utils.report import registros_relatorio
+from core.utils.scheduler import W_DESBALANCEAMENTO, capacidade_mensal, matriz_custos
+from core.utils.solvers import resolver_cpsat, resolver_fluxo, resolver_reparo
+
+
+def popular(clinicas, pontos_por_clinica, inicio=0):
+    """
+    Cria clínicas com pontos INFRA e MAQUINA, cada ponto com uma
+    análise aprovada, uma reprovada e uma atrasada, e reconstrói os
+    resumos de conformidade.
+    """
+    parametro, _ = WaterParameter.objects.get_or_create(
+        nome="pH",
+        defaults={
+            "categoria": "PH",
+            "unidade": "%",
+            "periodicidade": Periodicity.MENSAL,
+            "limite_minimo": 6,
+            "limite_maximo": 8,
+        },
+    )
+    hoje = timezone.localdate()
+
+    novas = Clinics.objects.bulk_create([
+        Clinics(nome=f"Clínica {inicio + i:04d}", numero_maximo_maquinas=10)
+        for i in range(clinicas)
+    ])
+    pontos = Point.objects.bulk_create([
+        Point(
+            nome=f"Ponto {j}",
+            tipo=PointType.INFRA if j % 2 else PointType.MAQUINA,
+            clinica=clinica,
+        )
+        for clinica in novas
+        for j in range(pontos_por_clinica)
+    ])
+    WaterAnalysis.objects.bulk_create([
+        WaterAnalysis(
+            ponto=ponto,
+            parametro=parametro,
+            valor=valor,
+            resultado=resultado,
+            data_da_coleta=hoje - timedelta(days=dias),
+            data_da_proxima_coleta=hoje - timedelta(days=dias) + timedelta(days=30),
+        )
+        for ponto in pontos
+        for valor, resultado, dias in (
+            (7, AnalysisResult.APROVADO, 1),
+            (9, AnalysisResult.REJEITADO, 2),
+            (7, AnalysisResult.APROVADO, 60),
+        )
+    ])
+    compliance_service.reconstruir()
+
+
+class BaseTestCase(TestCase):
+    """Cada teste começa com o registro de parâmetros vazio."""
+
+    def setUp(self):
+        parameters_service.limpar_registro()
+
+
+# =================================================
+# ===== RELATÓRIO =================================
+# =================================================
+
+class RelatorioConsultasTests(BaseTestCase):
+    """O relatório faz o mesmo número de consultas com 2 ou 40 clínicas."""
+
+    CONSULTAS = 5  # totais de pontos, de análises e de clínicas; cursores de clínicas e de pontos
+
+    def test_consultas_constantes(self):
+        total = 0
+        for clinicas, pontos in ((2, 2), (38, 6)):
+            popular(clinicas, pontos, inicio=total)
+            total += clinicas
+
+            with self.subTest(clinicas=total), self.assertNumQueries(self.CONSULTAS):
+                registros = list(registros_relatorio())
+
+            self.assertEqual(sum(r["tipo"] == "clinica" for r in registros), total)
+            self.assertEqual(registros[0]["atrasadas"], registros[0]["total_pontos"])
+            self.assertEqual(registros[0]["reprovadas"], registros[0]["total_pontos"])
+
+    def test_atrasadas_sem_varredura(self):
+        # os resumos ficam na referencia de hoje; o relatório de daqui a
+        # 60 dias vê as análises vencidas mesmo sem sweep_compliance
+        popular(3, 2)
+        depois = timezone.localtime() + timedelta(days=60)
+
+        geral, *resto = registros_relatorio(now=depois)
+
+        self.assertEqual(geral["atrasadas"], geral["total_analises"])
+        self.assertTrue(all(r["atrasadas"] == r["total_analises"] for r in resto if r["tipo"] == "clinica"))
+        self.assertTrue(all(r["status"] == "Reprovado e Atrasado" for r in resto if r["tipo"] == "ponto"))
+
+
+# =================================================
+# ===== PONTOS ====================================
+# =================================================
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}})
+class PontosConsultasTests(BaseTestCase):
+    """
+    Listas de pontos com a clínica embutida: versão dos dados + uma
+    página com JOIN na clínica, com 4 ou 240 pontos.
+    """
+
+    CONSULTAS = 2
+
+    def test_listar_pontos(self):
+        total = 0
+        for clinicas, pontos in ((2, 2), (30, 8)):
+            popular(clinicas, pontos, inicio=total)
+            total += clinicas * pontos
+
+            with self.subTest(pontos=total), self.assertNumQueries(self.CONSULTAS):
+                resposta = self.client.get("/api/points/", {"limit": 1000})
+
+            items = resposta.json()["items"]
+            self.assertEqual(len(items), total)
+            self.assertTrue(all(item["clinica"]["nome"] for item in items))
+
+    def test_listar_pontos_da_clinica(self):
+        for pontos in (2, 60):
+            popular(1, pontos, inicio=pontos)
+            clinica = Clinics.objects.get(nome=f"Clínica {pontos:04d}")
+
+            with self.subTest(pontos=pontos), self.assertNumQueries(self.CONSULTAS):
+                resposta = self.client.get(f"/api/clinics/points/{clinica.id}", {"limit": 1000})
+
+            items = resposta.json()["items"]
+            self.assertEqual(len(items), pontos)
+            self.assertTrue(all(item["clinica"]["id"] == str(clinica.id) for item in items))
+
+
+# =================================================
+# ===== REGISTRO DE PARÂMETROS ====================
+# =================================================
+
+class RegistroParametrosTests(TestCase):
+    """
+    Cada teste cria um parâmetro numa transação desfeita no fim: o
+    contador de versão volta ao mesmo número, mas o registro não pode
+    servir os parâmetros do teste anterior. Sem limpar_registro().
+    """
+
+    def _criar_e_usar(self, nome):
+        popular(1, 1, inicio=0)
+        parametro = WaterParameter.objects.create(
+            nome=nome, categoria="PH", unidade="%", periodicidade=Periodicity.MENSAL
+        )
+        analise = analysis_service.criar_analise({
+            "ponto": Point.objects.get().id,
+            "parametro": parametro.id,
+            "valor": 1.0,
+        })
+        self.assertEqual(analise.parametro_id, parametro.id)
+        self.assertIn(parametro.id, parameters_service.registro())
+
+    def test_a_primeira_transacao(self):
+        self._criar_e_usar("Cloro")
+
+    def test_b_depois_do_rollback(self):
+        self._criar_e_usar("Dureza")
+
+
+# =================================================
+# ===== ANÁLISES EM LOTE ==========================
+# =================================================
+
+class AnalisesLoteTests(BaseTestCase):
+    """POST/PUT /api/analysis/bulk e as colisões da chave natural."""
+
+    def setUp(self):
+        super().setUp()
+        popular(1, 2)
+        self.ponto, self.outro = Point.objects.order_by("nome")
+        self.parametro = WaterParameter.objects.get(nome="pH")
+        self.existente = WaterAnalysis.objects.filter(ponto=self.ponto).order_by("data_da_coleta").first()
+
+    def _item(self, ponto=None, dia=date(2020, 1, 1), valor=7.0):
+        return {
+            "ponto": str((ponto or self.ponto).id),
+            "parametro": str(self.parametro.id),
+            "valor": valor,
+            "data_da_coleta": dia.isoformat(),
+        }
+
+    def _enviar(self, metodo, caminho, corpo):
+        return getattr(self.client, metodo)(caminho, json.dumps(corpo), content_type="application/json")
+
+    def test_erros_por_linha(self):
+        itens = [
+            self._item(),                                        # ok
+            self._item(dia=self.existente.data_da_coleta),       # já gravada
+            self._item(),                                        # repete a linha 0
+            {**self._item(dia=date(2020, 2, 1)), "ponto": "00000000-0000-0000-0000-000000000000"},
+            self._item(ponto=self.outro, valor=9.0),             # ok, reprovada
+        ]
+        antes = WaterAnalysis.objects.count()
+
+        resposta = self._enviar("post", "/api/analysis/bulk", {"itens": itens})
+
+        self.assertEqual(resposta.status_code, 200)
+        corpo = resposta.json()
+        self.assertEqual(corpo["criadas"], 2)
+        self.assertEqual([e["indice"] for e in corpo["erros"]], [1, 2, 3])
+        self.assertEqual(WaterAnalysis.objects.count(), antes + 2)
+        self.assertEqual(
+            WaterAnalysis.objects.get(id=corpo["ids"][1]).resultado, AnalysisResult.REJEITADO
+        )
+
+    def test_tudo_ou_nada(self):
+        antes = WaterAnalysis.objects.count()
+        itens = [self._item(), self._item(dia=self.existente.data_da_coleta)]
+
+        corpo = self._enviar("post", "/api/analysis/bulk", {"itens": itens, "tudo_ou_nada": True}).json()
+
+        self.assertEqual(corpo["criadas"], 0)
+        self.assertEqual([e["indice"] for e in corpo["erros"]], [1])
+        self.assertEqual(WaterAnalysis.objects.count(), antes)
+
+    def test_criar_repetida_409(self):
+        resposta = self._enviar("post", "/api/analysis/", self._item(dia=self.existente.data_da_coleta))
+        self.assertEqual(resposta.status_code, 409)
+
+    def test_upsert_conta_criadas_atualizadas_inalteradas(self):
+        mesma = self._item(dia=self.existente.data_da_coleta, valor=self.existente.valor)
+        mesma["resultado"] = self.existente.resultado
+        corrigida = self._item(ponto=self.outro, dia=self.existente.data_da_coleta, valor=9.5)
+        antes = WaterAnalysis.objects.count()
+
+        corpo = self._enviar("put", "/api/analysis/bulk", {"itens": [mesma, corrigida, self._item()]}).json()
+
+        self.assertEqual((corpo["criadas"], corpo["atualizadas"], corpo["inalteradas"]), (1, 1, 1))
+        self.assertEqual(corpo["erros"], [])
+        self.assertEqual(WaterAnalysis.objects.count(), antes + 1)
+        self.assertEqual(corpo["ids"][0], str(self.existente.id))
+        atualizada = WaterAnalysis.objects.get(id=corpo["ids"][1])
+        self.assertEqual((atualizada.valor, atualizada.resultado), (9.5, AnalysisResult.REJEITADO))
+
+    def test_upsert_chave_repetida_no_lote(self):
+        corpo = self._enviar("put", "/api/analysis/bulk", {"itens": [self._item(), self._item(valor=8)]}).json()
+
+        self.assertEqual(corpo["criadas"], 1)
+        self.assertEqual(corpo["erros"], [{"indice": 1, "erro": "Mesma chave da linha 0"}])
+
+    def test_atualizar_data_recalcula_proxima_coleta(self):
+        nova = date(2026, 10, 1)
+
+        resposta = self._enviar("put", f"/api/analysis/{self.existente.id}", {"data_da_coleta": nova.isoformat()})
+
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.json()["data_da_proxima_coleta"], (nova + timedelta(days=30)).isoformat())
+
+    def test_atualizar_mantem_proxima_coleta_informada(self):
+        corpo = {"data_da_coleta": "2026-10-01", "data_da_proxima_coleta": "2026-12-01"}
+
+        resposta = self._enviar("put", f"/api/analysis/{self.existente.id}", corpo)
+
+        self.assertEqual(resposta.json()["data_da_proxima_coleta"], "2026-12-01")
+
+
+# =================================================
+# ===== RESUMOS DE CONFORMIDADE ===================
+# =================================================
+
+class ResumoConformidadeTests(BaseTestCase):
+    """Deltas de criar/atualizar/apagar batem com a reconstrução."""
+
+    def setUp(self):
+        super().setUp()
+        popular(2, 2)
+        self.ponto = Point.objects.order_by("nome").first()
+        self.parametro = WaterParameter.objects.get(nome="pH")
+
+    def _resumo(self):
+        resumo = PointComplianceSummary.objects.get(ponto=self.ponto)
+        return resumo.total, resumo.atrasadas, resumo.reprovadas
+
+    def assertSemDivergencias(self):
+        divergencias = compliance_service.reconstruir(somente_verificar=True)
+        self.assertEqual(divergencias, {"pontos": [], "clinicas": []})
+
+    def test_criar_atualizar_apagar(self):
+        hoje = timezone.localdate()
+        total, atrasadas, reprovadas = self._resumo()
+
+        analise = analysis_service.criar_analise({
+            "ponto": self.ponto.id,
+            "parametro": self.parametro.id,
+            "valor": 9.0,
+            "data_da_coleta": hoje - timedelta(days=90),
+        })
+        self.assertEqual(self._resumo(), (total + 1, atrasadas + 1, reprovadas + 1))
+        self.assertSemDivergencias()
+
+        analysis_service.atualizar_analise(analise.id, {"valor": 7.0, "resultado": AnalysisResult.APROVADO})
+        self.assertEqual(self._resumo(), (total + 1, atrasadas + 1, reprovadas))
+        self.assertSemDivergencias()
+
+        analysis_service.atualizar_analise(analise.id, {"data_da_coleta": hoje - timedelta(days=5)})
+        self.assertEqual(self._resumo(), (total + 1, atrasadas, reprovadas))
+        self.assertSemDivergencias()
+
+        analysis_service.deletar_analise(analise.id)
+        self.assertEqual(self._resumo(), (total, atrasadas, reprovadas))
+        self.assertSemDivergencias()
+
+    def test_apagar_sem_linha_de_resumo(self):
+        analise = WaterAnalysis.objects.filter(ponto=self.ponto).first()
+        PointComplianceSummary.objects.filter(ponto=self.ponto).delete()
+        ClinicComplianceSummary.objects.filter(clinica=self.ponto.clinica_id).delete()
+
+        analysis_service.deletar_analise(analise.id)
+
+        self.assertFalse(PointComplianceSummary.objects.filter(ponto=self.ponto).exists())
+        self.assertFalse(ClinicComplianceSummary.objects.filter(clinica=self.ponto.clinica_id).exists())
+        self.assertFalse(PointComplianceSummary.objects.filter(total__lt=0).exists())
+
+
+# =================================================
+# ===== SOLVERS ===================================
+# =================================================
+
+def custos_sinteticos(n, semente=0):
+    """Matriz de custos do scheduler para n análises aleatórias (seed fixa)."""
+    rng = np.random.default_rng(semente)
+    hoje = date(2026, 1, 15)
+    dados = {
+        "proxima": np.datetime64(hoje, "D") + rng.integers(-200, 365, n),
+        "reprovada": rng.random(n) < 0.05,
+    }
+    return matriz_custos(dados, hoje)
+
+
+def custo_total(custos, escolha):
+    return int(custos[np.arange(len(custos)), escolha].sum())
+
+
+class SolversTests(SimpleTestCase):
+
+    PARAMETROS = {"tempo_limite": 30, "num_workers": 1, "semente": 0}
+
+    def assertDentroDaCapacidade(self, escolha, capacidade):
+        cargas = np.bincount(escolha, minlength=12)
+        self.assertTrue((cargas <= capacidade).all(), cargas)
+
+    def test_fluxo_igual_ao_otimo_cpsat(self):
+        for n, agregar in ((200, True), (120, False)):
+            custos = custos_sinteticos(n, semente=n)
+            capacidade = capacidade_mensal(n)
+
+            with self.subTest(n=n, agregar=agregar):
+                metricas = {}
+                cpsat = resolver_cpsat(
+                    custos, capacidade, W_DESBALANCEAMENTO,
+                    agregar=agregar, metricas=metricas, **self.PARAMETROS,
+                )
+                fluxo = resolver_fluxo(custos, capacidade)
+
+                self.assertEqual(metricas["status"], "OPTIMAL")
+                self.assertEqual(custo_total(custos, fluxo), custo_total(custos, cpsat))
+                self.assertDentroDaCapacidade(fluxo, capacidade)
+                self.assertDentroDaCapacidade(cpsat, capacidade)
+
+    def test_reparo_mantem_as_fixas(self):
+        n = 150
+        custos = custos_sinteticos(n, semente=1)
+        capacidade = capacidade_mensal(n)
+        plano = resolver_fluxo(custos, capacidade)
+
+        # um terço das análises sai do plano (novas ou alteradas)
+        livres = set(range(0, n, 3))
+        anterior = [None if i in livres else m for i, m in enumerate(plano)]
+
+        metricas = {}
+        escolha = resolver_reparo(
+            custos, anterior, capacidade, W_DESBALANCEAMENTO, metricas=metricas, **self.PARAMETROS
+        )
+
+        self.assertEqual(metricas["fixadas"], n - len(livres))
+        self.assertTrue(all(escolha[i] == m for i, m in enumerate(anterior) if m is not None))
+        self.assertTrue(all(escolha[i] is not None for i in livres))
+        self.assertDentroDaCapacidade(escolha, capacidade)
+
+    def test_reparo_inviavel_quando_fixas_estouram(self):
+        custos = custos_sinteticos(30)
+        anterior = [0] * 20 + [None] * 10
+
+        metricas = {}
+        escolha = resolver_reparo(custos, anterior, 10, W_DESBALANCEAMENTO, metricas=metricas)
+
+        self.assertIsNone(escolha)
+        self.assertEqual(metricas["status"], "INFEASIBLE")
+
+
+# =================================================
+# ===== PAGINAÇÃO POR CURSOR ======================
+# =================================================
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}})
+class PaginacaoCursorTests(BaseTestCase):
+    """
+    Percorre as listas página a página. popular() repete datas de
+    coleta e nomes de ponto, então a ordenação tem empates na primeira
+    coluna e o desempate fica com o id.
+    """
+
+    def setUp(self):
+        super().setUp()
+        popular(4, 5)
+
+    def _todas_as_paginas(self, caminho, limit):
+        itens, cursor, paginas = [], None, 0
+        while True:
+            params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+            corpo = self.client.get(caminho, params).json()
+            itens += corpo["items"]
+            paginas += 1
+            cursor = corpo["next_cursor"]
+            if cursor is None:
+                return itens, paginas
+            # cursor que não avança repetiria páginas para sempre
+            self.assertLessEqual(len(itens), 1000, "paginação não termina")
+
+    def test_analises_sem_repeticao_nem_lacuna(self):
+        esperados = list(
+            WaterAnalysis.objects.order_by("data_da_coleta", "id").values_list("id", flat=True)
+        )
+
+        for limit in (1, 7, 20, len(esperados), 1000):
+            with self.subTest(limit=limit):
+                itens, paginas = self._todas_as_paginas("/api/analysis/", limit)
+
+                self.assertEqual([item["id"] for item in itens], [str(i) for i in esperados])
+                self.assertEqual(paginas, max(1, -(-len(esperados) // limit)))
+
+    def test_pontos_com_nomes_empatados(self):
+        esperados = [str(i) for i in Point.objects.order_by("nome", "id").values_list("id", flat=True)]
+
+        itens, _ = self._todas_as_paginas("/api/points/", 3)
+
+        self.assertEqual([item["id"] for item in itens], esperados)
+        self.assertEqual(len(set(esperados)), len(esperados))
+
+    def test_contagem_opcional(self):
+        corpo = self.client.get("/api/analysis/", {"limit": 5, "with_count": True}).json()
+
+        self.assertEqual(corpo["count"], WaterAnalysis.objects.count())
+        self.assertIsNone(self.client.get("/api/analysis/", {"limit": 5}).json()["count"])
+
+    def test_cursor_invalido_400(self):
+        for cursor in ("nao-e-base64!", "W10=", "WyJ4IiwgInkiXQ=="):  # lixo, [], ["x", "y"]
+            with self.subTest(cursor=cursor):
+                resposta = self.client.get("/api/analysis/", {"cursor": cursor})
+                self.assertEqual(resposta.status_code, 400)
+                self.assertEqual(resposta.json()["detail"], "Cursor inválido")
@@ -0,0 +1,124 @@
+import hashlib
+import os
+import tempfile
+import threading
+from pathlib import Path
+from django.conf import settings
+
+
+# -------------------------------------------------
+# Cache em disco de artefatos (relatórios, gráficos)
+# -------------------------------------------------
+# Cada artefato é um arquivo nomeado pelo hash de (nome, versão dos
+# dados). O mtime é atualizado a cada acerto, então o arquivo mais
+# antigo é o menos usado recentemente; a evicção apaga a partir dele
+# até o total caber em ARTIFACT_CACHE_MAX_MB.
+
+_lock = threading.Lock()
+
+
+def _diretorio():
+    diretorio = Path(settings.ARTIFACT_CACHE_DIR)
+    diretorio.mkdir(parents=True, exist_ok=True)
+    return diretorio
+
+
+def _limite_bytes():
+    return settings.ARTIFACT_CACHE_MAX_MB * 1024 * 1024
+
+
+def caminho(nome, versao):
+    """Arquivo do artefato no cache (pode ainda não existir)."""
+    extensao = Path(nome).suffix
+    chave = hashlib.sha1(f"{nome}|{versao}".encode()).hexdigest()
+    return _diretorio() / f"{chave}{extensao}"
+
+
+def obter(nome, versao):
+    """Caminho do artefato em cache, ou None. Marca como usado."""
+    destino = caminho(nome, versao)
+    try:
+        os.utime(destino)
+    except FileNotFoundError:
+        return None
+    return destino
+
+
+def _evictar():
+    with _lock:
+        arquivos = []
+        for arquivo in _diretorio().iterdir():
+            if arquivo.name.startswith("."):
+                continue  # escritas em andamento
+            try:
+                info = arquivo.stat()
+            except FileNotFoundError:
+                continue
+            arquivos.append((info.st_mtime, info.st_size, arquivo))
+
+        total = sum(tamanho for _, tamanho, _ in arquivos)
+        limite = _limite_bytes()
+
+        for _, tamanho, arquivo in sorted(arquivos):
+            if total <= limite:
+                break
+            arquivo.unlink(missing_ok=True)
+            total -= tamanho
+
+
+class Escrita:
+    """
+    Escrita atômica de um artefato: grava num arquivo temporário e só
+    publica no cache em concluir(). descartar() apaga o temporário.
+    """
+
+    def __init__(self, nome, versao, modo="wb"):
+        self.destino = caminho(nome, versao)
+        fd, self.temporario = tempfile.mkstemp(dir=_diretorio(), prefix=".tmp-")
+        self.arquivo = os.fdopen(fd, modo)
+
+    def concluir(self):
+        self.arquivo.close()
+        os.chmod(self.temporario, 0o644)  # mkstemp cria com 0600
+        os.replace(self.temporario, self.destino)
+        _evictar()
+        return self.destino
+
+    def descartar(self):
+        self.arquivo.close()
+        Path(self.temporario).unlink(missing_ok=True)
+
+
+def obter_ou_gerar(nome, versao, gerar):
+    """
+    Devolve o artefato (nome, versao) do cache; se faltar, chama
+    gerar(caminho_temporario) para escrevê-lo e guarda o resultado.
+    """
+    existente = obter(nome, versao)
+    if existente is not None:
+        return existente
+
+    escrita = Escrita(nome, versao)
+    try:
+        escrita.arquivo.close()
+        gerar(Path(escrita.temporario))
+    except BaseException:
+        escrita.descartar()
+        raise
+    return escrita.concluir()
+
+
+def armazenar_stream(nome, versao, partes, encoding="utf-8"):
+    """
+    Repassa as partes (str) de um gerador e grava uma cópia no cache.
+    A cópia só é publicada se o gerador chegar ao fim.
+    """
+    escrita = Escrita(nome, versao)
+    try:
+        for parte in partes:
+            escrita.arquivo.write(parte.encode(encoding))
+            yield parte
+    except BaseException:
+        escrita.descartar()
+        raise
+    escrita.concluir()
@@ -0,0 +1,52 @@
+import io
+import matplotlib
+
+matplotlib.use("Agg")
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg  # noqa: E402
+from matplotlib.figure import Figure  # noqa: E402
+
+
+# -------------------------------------------------
+# Renderização pura (sem Django)
+# -------------------------------------------------
+# Importado pelos processos do pool de gráficos. Os pools usam "spawn"
+# (não herdam threads nem conexões do processo web), então este módulo
+# não pode depender de models nem de settings.
+
+MESES = list(range(1, 13))
+
+
+def renderizar(series, titulo="Distribuição mensal de coletas agendadas", formato="png"):
+    """Gráfico de barras (empilhadas por série) → bytes PNG/SVG."""
+
+    fig = Figure(figsize=(10, 5))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+
+    base = [0] * 12
+    for serie, y in series.items():
+        ax.bar(MESES, y, bottom=base, label=str(serie))
+        base = [b + v for b, v in zip(base, y)]
+
+    ax.set_xlabel("Mês")
+    ax.set_ylabel("Número de coletas")
+    ax.set_title(titulo)
+    ax.set_xticks(MESES)
+
+    if len(series) > 1:
+        ax.legend(fontsize="small", ncol=max(1, len(series) // 15))
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=formato, bbox_inches="tight")
+    return buffer.getvalue()
+
+
+def aquecer_worker():
+    # carrega fontes e backend antes da primeira tarefa
+    renderizar({"": [0] * 12}, titulo="")
+
+
+def renderizar_tarefa(tarefa):
+    nome, titulo, series, formato = tarefa
+    return nome, renderizar(series, titulo, formato)
@@ -0,0 +1,156 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Count
+from django.db.models.functions import ExtractMonth
+
+from core.models import WaterAnalysis
+from core.services import data_version_service
+from core.utils import artifact_cache
+from core.utils.chart_render import aquecer_worker, renderizar, renderizar_tarefa
+
+
+# -------------------------------------------------
+# Gráficos mensais renderizados sem pyplot
+# -------------------------------------------------
+# Cada gráfico usa uma Figure própria com canvas Agg, sem estado global
+# (core/utils/chart_render.py). A renderização roda em pools de
+# processos (o matplotlib não é thread-safe e segura o GIL); cada worker
+# paga uma vez o aquecimento do cache de fontes.
+
+FORMATOS = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+}
+
+# dimensão → (campo da chave, campo do nome)
+DIMENSOES = {
+    "clinica": ("ponto__clinica_id", "ponto__clinica__nome"),
+    "parametro": ("parametro_id", "parametro__nome"),
+}
+
+
+def _novo_pool(max_workers=None):
+    # spawn: o filho não herda as threads do servidor ASGI nem conexões
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=aquecer_worker,
+    )
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def pool():
+    """Pool compartilhado do processo para renderizações sob demanda."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = _novo_pool(settings.CHARTS_WORKERS)
+    return _pool
+
+
+def contagens_por(dimensao, chave=None):
+    """{chave: (nome, [12 contagens])} em uma consulta agrupada."""
+    campo_chave, campo_nome = DIMENSOES[dimensao]
+
+    analyses = WaterAnalysis.objects.filter(
+        data_da_proxima_coleta__isnull=False, **{f"{campo_chave}__isnull": False}
+    )
+    if chave is not None:
+        analyses = analyses.filter(**{campo_chave: chave})
+
+    linhas = (
+        analyses
+        .values(campo_chave, campo_nome, mes=ExtractMonth("data_da_proxima_coleta"))
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+
+    contagens = {}
+    for linha in linhas:
+        _, meses = contagens.setdefault(
+            str(linha[campo_chave]), (linha[campo_nome], [0] * 12)
+        )
+        meses[linha["mes"] - 1] = linha["n"]
+    return contagens
+
+
+def nome_artefato(dimensao, chave, formato):
+    return f"chart|{dimensao}={chave}.{formato}"
+
+
+def gerar_lote(dimensoes=tuple(DIMENSOES), formato="png", max_workers=None, versao=None):
+    """
+    Renderiza um gráfico por clínica e por parâmetro (os que ainda não
+    estão no cache para a versão atual dos dados) em um pool de
+    processos. Retorna quantos foram gerados.
+    """
+    versao = versao or data_version_service.versao_dados()
+
+    tarefas = []
+    for dimensao in dimensoes:
+        for chave, (nome, meses) in contagens_por(dimensao).items():
+            artefato = nome_artefato(dimensao, chave, formato)
+            if artifact_cache.obter(artefato, versao) is None:
+                tarefas.append((artefato, f"Coletas agendadas por mês — {nome}", {nome: meses}, formato))
+
+    if not tarefas:
+        return 0
+
+    with _novo_pool(max_workers) as lote:
+        for artefato, conteudo in lote.map(renderizar_tarefa, tarefas, chunksize=4):
+            artifact_cache.obter_ou_gerar(artefato, versao, lambda destino: destino.write_bytes(conteudo))
+
+    return len(tarefas)
+
+
+def obter_grafico(dimensao, chave, formato="png", versao=None):
+    """
+    Caminho do gráfico de uma clínica/parâmetro no cache. Na falta,
+    renderiza só esse no próprio processo. None se não há análises.
+    """
+    versao = versao or data_version_service.versao_dados()
+    artefato = nome_artefato(dimensao, chave, formato)
+
+    existente = artifact_cache.obter(artefato, versao)
+    if existente is not None:
+        return existente
+
+    contagens = contagens_por(dimensao, chave)
+    if not contagens:
+        return None
+
+    nome, meses = contagens[str(chave)]
+    conteudo = renderizar({nome: meses}, f"Coletas agendadas por mês — {nome}", formato)
+    return artifact_cache.obter_ou_gerar(artefato, versao, lambda destino: destino.write_bytes(conteudo))
+
+
+async def aobter_grafico(dimensao, chave, formato="png", versao=None):
+    """
+    Como obter_grafico, para views async: a consulta roda numa thread
+    e a renderização no pool de processos, sem bloquear o event loop.
+    """
+    versao = versao or await data_version_service.aversao_dados()
+    artefato = nome_artefato(dimensao, chave, formato)
+
+    existente = artifact_cache.obter(artefato, versao)
+    if existente is not None:
+        return existente
+
+    contagens = await sync_to_async(contagens_por)(dimensao, chave)
+    if not contagens:
+        return None
+
+    nome, meses = contagens[str(chave)]
+    tarefa = (artefato, f"Coletas agendadas por mês — {nome}", {nome: meses}, formato)
+    _, conteudo = await asyncio.get_running_loop().run_in_executor(pool(), renderizar_tarefa, tarefa)
+
+    return await sync_to_async(artifact_cache.obter_ou_gerar, thread_sensitive=False)(
+        artefato, versao, lambda destino: destino.write_bytes(conteudo)
+    )
@@ -1,31 +1,67 @@
-import matplotlib.pyplot as plt
-from collections import Counter
+import shutil
 from pathlib import Path
+from django.db.models import Count, F
+from django.db.models.functions import ExtractMonth, ExtractYear
 from django.utils import timezone
 
 from core.models import WaterAnalysis
+from core.services import data_version_service
+from core.utils import artifact_cache, charts
 
 
-def generate_monthly_chart():
+# agrupar_por → expressão da série
+SERIES = {
+    "clinica": F("ponto__clinica__nome"),
+    "parametro": F("parametro__nome"),
+    "ano": ExtractYear("data_da_proxima_coleta"),
+}
+
+
+def contagens_mensais(clinica=None, categoria=None, inicio=None, fim=None, agrupar_por=None):
     """
-    Gera gráfico de barras com número de coletas por mês.
-    Salva PNG em core/utils/reports/
+    Coletas agendadas por mês (de data_da_proxima_coleta), contadas no
+    banco. Retorna {serie: [12 contagens]}; sem agrupar_por há uma
+    única série "Total".
+
+    Filtros: clinica (id), categoria do parâmetro e intervalo
+    [inicio, fim] da próxima coleta.
     """
+    analyses = WaterAnalysis.objects.filter(data_da_proxima_coleta__isnull=False)
 
-    hoje = timezone.localtime()
+    if clinica:
+        analyses = analyses.filter(ponto__clinica_id=clinica)
+    if categoria:
+        analyses = analyses.filter(parametro__categoria=categoria)
+    if inicio:
+        analyses = analyses.filter(data_da_proxima_coleta__gte=inicio)
+    if fim:
+        analyses = analyses.filter(data_da_proxima_coleta__lte=fim)
+
+    campos = {"mes": ExtractMonth("data_da_proxima_coleta")}
+    if agrupar_por:
+        campos["serie"] = SERIES[agrupar_por]
 
-    analyses = WaterAnalysis.objects.all()
+    linhas = analyses.values(**campos).annotate(n=Count("id")).order_by()
 
-    months = []
+    series = {}
+    for linha in linhas:
+        serie = linha.get("serie", "Total")
+        if serie is None:
+            serie = "Sem clínica"
+        series.setdefault(serie, [0] * 12)[linha["mes"] - 1] = linha["n"]
 
-    for a in analyses:
-        if a.data_da_proxima_coleta:
-            months.append(a.data_da_proxima_coleta.month)
+    return dict(sorted(series.items(), key=lambda item: str(item[0])))
 
-    counts = Counter(months)
 
-    x = list(range(1, 13))
-    y = [counts.get(m, 0) for m in x]
+def generate_monthly_chart(clinica=None, categoria=None, inicio=None, fim=None, agrupar_por=None):
+    """
+    Gera gráfico de barras com número de coletas por mês.
+    Com agrupar_por ("clinica", "parametro" ou "ano") as barras são
+    empilhadas por série.
+    Salva PNG em core/utils/reports/
+    """
+
+    hoje = timezone.localtime()
 
     reports_dir = Path(__file__).parent / "reports"
     reports_dir.mkdir(exist_ok=True)
@@ -33,16 +69,22 @@ def generate_monthly_chart():
     filename = f"monthly_distribution_{hoje.strftime('%d-%m-%Y_%H-%M')}.png"
     filepath = reports_dir / filename
 
-    plt.figure(figsize=(10, 5))
-    plt.bar(x, y)
-    plt.xlabel("Mês")
-    plt.ylabel("Número de coletas")
-    plt.title("Distribuição mensal de coletas agendadas")
-    plt.xticks(x)
+    filtros = dict(
+        clinica=clinica,
+        categoria=categoria,
+        inicio=inicio,
+        fim=fim,
+        agrupar_por=agrupar_por,
+    )
 
-    plt.savefig(filepath, bbox_inches="tight")
-    plt.close()
+    nome = "monthly_distribution|" + "|".join(f"{k}={v}" for k, v in filtros.items()) + ".png"
+    versao = data_version_service.versao_dados(hoje=hoje.date())
+    artefato = artifact_cache.obter_ou_gerar(
+        nome, versao, lambda destino: destino.write_bytes(charts.renderizar(contagens_mensais(**filtros)))
+    )
+    shutil.copyfile(artefato, filepath)
 
     print(f"\nGráfico salvo em:\n{filepath}\n")
 
     return filepath
+
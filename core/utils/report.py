@@ -1,12 +1,40 @@
+import csv
+import json
+import shutil
+from itertools import groupby
 from pathlib import Path
+from django.db.models import Count, Exists, OuterRef, Q
 from django.utils import timezone
 
 from core.models import (
+    AnalysisResult,
     Clinics,
     Point,
-    WaterAnalysis,
     PointType,
-    AnalysisResult,
+    WaterAnalysis,
+)
+from core.services import data_version_service
+from core.utils import artifact_cache
+
+
+# Linhas buscadas por ida ao banco nos cursores do lado do servidor
+CHUNK_SIZE = 2000
+
+COLUNAS_CSV = (
+    "tipo",
+    "clinica_id",
+    "clinica_nome",
+    "ponto_id",
+    "ponto_nome",
+    "total_clinicas",
+    "total_pontos",
+    "infra",
+    "maquinas",
+    "numero_maximo_maquinas",
+    "total_analises",
+    "atrasadas",
+    "reprovadas",
+    "status",
 )
 
 
@@ -15,164 +43,278 @@ from core.models import (
 # -------------------------------------------------
 
 def pct(part, total):
-    if total == 0:
+    if not total:
         return 0
     return round((part / total) * 100, 2)
 
 
+def _status_ponto(has_reprovado, has_atraso):
+    if has_reprovado and has_atraso:
+        return "Reprovado e Atrasado"
+    if has_reprovado:
+        return "Reprovado"
+    return "Atrasado"
+
+
+class _Eco:
+    """Pseudo-buffer: o csv.writer escreve e a linha volta como retorno."""
+
+    def write(self, value):
+        return value
+
+
 # -------------------------------------------------
-# MAIN
+# registros
 # -------------------------------------------------
 
-def generate_report():
-    now = timezone.localtime()
+def registros_relatorio(now=None):
+    """
+    Gera o relatório como uma sequência de registros (dicts):
+    um "geral", depois, para cada clínica em ordem de nome, um "clinica"
+    seguido dos seus pontos problemáticos ("ponto").
+
+    Clínicas e pontos vêm de cursores do lado do servidor na mesma
+    ordenação e são casados em memória, então o consumo de memória não
+    depende do número de clínicas e o primeiro registro sai antes de a
+    última clínica ser lida.
+
+    As contagens são agregações condicionais sobre WaterAnalysis no
+    momento da leitura, então "atrasadas" é sempre relativo a
+    now.date(), sem depender da varredura dos resumos de conformidade.
+    O número de consultas é fixo (5).
+    """
+    now = now or timezone.localtime()
     hoje = now.date()
 
-    base_dir = Path(__file__).resolve().parent
-    reports_dir = base_dir / "reports"
-    reports_dir.mkdir(exist_ok=True)
+    reprovada = Q(resultado=AnalysisResult.REJEITADO)
+    atrasada = Q(data_da_proxima_coleta__lt=hoje)
 
-    filename = f"report_{now.strftime('%d-%m-%Y_%H-%M')}.txt"
-    filepath = reports_dir / filename
+    # =================================================
+    # ===== ESTATÍSTICAS GERAIS ========================
+    # =================================================
 
-    lines = []
+    totais_pontos = Point.objects.aggregate(
+        total=Count("id"),
+        infra=Count("id", filter=Q(tipo=PointType.INFRA)),
+        maquinas=Count("id", filter=Q(tipo=PointType.MAQUINA)),
+    )
+
+    totais_analises = WaterAnalysis.objects.aggregate(
+        total=Count("id"),
+        atrasadas=Count("id", filter=atrasada),
+        reprovadas=Count("id", filter=reprovada),
+    )
+
+    yield {
+        "tipo": "geral",
+        "gerado_em": now,
+        "total_clinicas": Clinics.objects.count(),
+        "total_pontos": totais_pontos["total"],
+        "infra": totais_pontos["infra"],
+        "maquinas": totais_pontos["maquinas"],
+        "total_analises": totais_analises["total"],
+        "atrasadas": totais_analises["atrasadas"],
+        "reprovadas": totais_analises["reprovadas"],
+    }
 
     # =================================================
-    # ===== ESTATÍSTICAS GERAIS ========================
+    # ===== POR CLÍNICA ===============================
     # =================================================
 
-    total_clinics = Clinics.objects.count()
+    clinicas = (
+        Clinics.objects
+        .order_by("nome", "id")
+        .annotate(
+            # o JOIN com as análises repete cada ponto: pontos com distinct
+            total_pontos=Count("pontos", distinct=True),
+            infra=Count("pontos", filter=Q(pontos__tipo=PointType.INFRA), distinct=True),
+            maquinas=Count("pontos", filter=Q(pontos__tipo=PointType.MAQUINA), distinct=True),
+            total_analises=Count("pontos__analises_agua"),
+            reprovadas=Count("pontos__analises_agua", filter=Q(pontos__analises_agua__resultado=AnalysisResult.REJEITADO)),
+            atrasadas=Count("pontos__analises_agua", filter=Q(pontos__analises_agua__data_da_proxima_coleta__lt=hoje)),
+        )
+        .values(
+            "id", "nome", "numero_maximo_maquinas", "total_pontos", "infra",
+            "maquinas", "total_analises", "reprovadas", "atrasadas",
+        )
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
 
-    total_points = Point.objects.count()
-    total_infra = Point.objects.filter(tipo=PointType.INFRA).count()
-    total_maquinas = Point.objects.filter(tipo=PointType.MAQUINA).count()
+    analises_do_ponto = WaterAnalysis.objects.filter(ponto=OuterRef("pk"))
 
-    total_analyses = WaterAnalysis.objects.count()
+    pontos = (
+        Point.objects
+        .filter(clinica__isnull=False)
+        .annotate(
+            has_reprovado=Exists(analises_do_ponto.filter(reprovada)),
+            has_atraso=Exists(analises_do_ponto.filter(atrasada)),
+        )
+        .filter(Q(has_reprovado=True) | Q(has_atraso=True))
+        .order_by("clinica__nome", "clinica_id", "nome")
+        .values("id", "nome", "clinica_id", "has_reprovado", "has_atraso")
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
 
-    total_reprovadas = WaterAnalysis.objects.filter(
-        resultado=AnalysisResult.REJEITADO
-    ).count()
+    # Pontos agrupados por clínica, na mesma ordem das clínicas
+    grupos = groupby(pontos, key=lambda p: p["clinica_id"])
+    pendente = next(grupos, None)
 
-    total_atrasadas = WaterAnalysis.objects.filter(
-        data_da_proxima_coleta__lt=hoje
-    ).count()
+    for clinica in clinicas:
 
-    lines.append("=" * 90)
-    lines.append("RELATÓRIO DE QUALIDADE DAS ANÁLISES DE ÁGUA")
-    lines.append(f"Gerado em: {now.strftime('%d/%m/%Y %H:%M')}")
-    lines.append("=" * 90)
-    lines.append("")
+        yield {"tipo": "clinica", **clinica}
 
-    lines.append("===== ESTATÍSTICAS GERAIS =====")
-    lines.append(f"Clínicas totais: {total_clinics}")
-    lines.append("")
+        if pendente is None or pendente[0] != clinica["id"]:
+            continue
 
-    lines.append("Pontos:")
-    lines.append(f"  • Total: {total_points}")
-    lines.append(f"  • Infraestrutura: {total_infra}")
-    lines.append(f"  • Máquinas: {total_maquinas}")
-    lines.append("")
+        for ponto in pendente[1]:
+            yield {
+                "tipo": "ponto",
+                "id": ponto["id"],
+                "nome": ponto["nome"],
+                "clinica_id": clinica["id"],
+                "clinica_nome": clinica["nome"],
+                "status": _status_ponto(ponto["has_reprovado"], ponto["has_atraso"]),
+            }
 
-    lines.append(f"Análises totais: {total_analyses}")
-    lines.append(
-        f"  • Atrasadas: {total_atrasadas} ({pct(total_atrasadas, total_analyses)}%)"
-    )
-    lines.append(
-        f"  • Reprovadas: {total_reprovadas} ({pct(total_reprovadas, total_analyses)}%)"
-    )
+        pendente = next(grupos, None)
 
-    lines.append("\n" + "=" * 90 + "\n")
 
-    # =================================================
-    # ===== POR CLÍNICA ===============================
-    # =================================================
+# -------------------------------------------------
+# formatos
+# -------------------------------------------------
 
-    for clinic in Clinics.objects.all().order_by("nome"):
+def linhas_texto(registros):
+    """Relatório legível, uma linha (com \\n) por vez."""
+
+    com_pontos = None
+
+    def fechar_clinica():
+        if com_pontos is False:
+            yield "Nenhum ponto com problemas 🎉\n"
+        if com_pontos is not None:
+            yield "\n\n"
+
+    for r in registros:
+
+        if r["tipo"] == "geral":
+            yield "=" * 90 + "\n"
+            yield "RELATÓRIO DE QUALIDADE DAS ANÁLISES DE ÁGUA\n"
+            yield f"Gerado em: {r['gerado_em'].strftime('%d/%m/%Y %H:%M')}\n"
+            yield "=" * 90 + "\n"
+            yield "\n"
+            yield "===== ESTATÍSTICAS GERAIS =====\n"
+            yield f"Clínicas totais: {r['total_clinicas']}\n"
+            yield "\n"
+            yield "Pontos:\n"
+            yield f"  • Total: {r['total_pontos']}\n"
+            yield f"  • Infraestrutura: {r['infra']}\n"
+            yield f"  • Máquinas: {r['maquinas']}\n"
+            yield "\n"
+            yield f"Análises totais: {r['total_analises']}\n"
+            yield f"  • Atrasadas: {r['atrasadas']} ({pct(r['atrasadas'], r['total_analises'])}%)\n"
+            yield f"  • Reprovadas: {r['reprovadas']} ({pct(r['reprovadas'], r['total_analises'])}%)\n"
+            yield "\n" + "=" * 90 + "\n\n"
+
+        elif r["tipo"] == "clinica":
+            yield from fechar_clinica()
+            com_pontos = False
+
+            yield f"CLÍNICA: {r['nome']} ({r['id']})\n"
+            yield "-" * 90 + "\n"
+            yield "Pontos:\n"
+            yield f"  • Total: {r['total_pontos']}\n"
+            yield f"  • Infraestrutura: {r['infra']}\n"
+            yield f"  • Máquinas: {r['maquinas']} de {r['numero_maximo_maquinas']} ({pct(r['maquinas'], r['numero_maximo_maquinas'])})\n"
+            yield "\n"
+            yield f"Análises totais: {r['total_analises']}\n"
+            yield f"  • Atrasadas: {r['atrasadas']} ({pct(r['atrasadas'], r['total_analises'])}%)\n"
+            yield f"  • Reprovadas: {r['reprovadas']} ({pct(r['reprovadas'], r['total_analises'])}%)\n"
+            yield "\n"
 
-        pontos = clinic.pontos.all()
+        else:
+            if not com_pontos:
+                yield "Pontos com problemas:\n"
+                com_pontos = True
+            yield f"- {r['nome']} ({r['id']}) → {r['status']}\n"
 
-        total_pontos = pontos.count()
-        infra = pontos.filter(tipo=PointType.INFRA).count()
-        maquinas = pontos.filter(tipo=PointType.MAQUINA).count()
+    yield from fechar_clinica()
 
-        analyses = WaterAnalysis.objects.filter(ponto__clinica=clinic)
 
-        total_analises = analyses.count()
+def linhas_csv(registros):
+    """Uma linha CSV por registro, com cabeçalho fixo (COLUNAS_CSV)."""
 
-        reprovadas = analyses.filter(
-            resultado=AnalysisResult.REJEITADO
-        ).count()
+    writer = csv.writer(_Eco())
+    yield writer.writerow(COLUNAS_CSV)
 
-        atrasadas = analyses.filter(
-            data_da_proxima_coleta__lt=hoje
-        ).count()
+    for r in registros:
 
-        # -------------------------------------------------
+        linha = dict.fromkeys(COLUNAS_CSV, "")
 
-        lines.append(f"CLÍNICA: {clinic.nome} ({clinic.id})")
-        lines.append("-" * 90)
+        if r["tipo"] == "ponto":
+            linha.update(
+                tipo="ponto",
+                clinica_id=r["clinica_id"],
+                clinica_nome=r["clinica_nome"],
+                ponto_id=r["id"],
+                ponto_nome=r["nome"],
+                status=r["status"],
+            )
+        else:
+            linha.update({chave: r[chave] for chave in COLUNAS_CSV if chave in r})
+            if r["tipo"] == "clinica":
+                linha.update(clinica_id=r["id"], clinica_nome=r["nome"])
 
-        lines.append("Pontos:")
-        lines.append(f"  • Total: {total_pontos}")
-        lines.append(f"  • Infraestrutura: {infra}")
-        lines.append(f"  • Máquinas: {maquinas} de {clinic.numero_maximo_maquinas} ({pct(maquinas, clinic.numero_maximo_maquinas)})")
-        lines.append("")
+        yield writer.writerow([linha[chave] for chave in COLUNAS_CSV])
 
-        lines.append(f"Análises totais: {total_analises}")
-        lines.append(
-            f"  • Atrasadas: {atrasadas} ({pct(atrasadas, total_analises)}%)"
-        )
-        lines.append(
-            f"  • Reprovadas: {reprovadas} ({pct(reprovadas, total_analises)}%)"
-        )
 
-        lines.append("")
+def linhas_jsonl(registros):
+    """Um objeto JSON por linha."""
 
-        # -------------------------------------------------
-        # Pontos problemáticos
-        # -------------------------------------------------
+    for r in registros:
+        yield json.dumps(r, default=str, ensure_ascii=False) + "\n"
 
-        problematic_points = []
 
-        for point in pontos:
+FORMATADORES = {
+    "text": linhas_texto,
+    "csv": linhas_csv,
+    "jsonl": linhas_jsonl,
+}
 
-            pa = point.analises_agua.all()
 
-            has_reprovado = pa.filter(
-                resultado=AnalysisResult.REJEITADO
-            ).exists()
+EXTENSOES = {"text": "txt", "csv": "csv", "jsonl": "jsonl"}
 
-            has_atraso = pa.filter(
-                data_da_proxima_coleta__lt=hoje
-            ).exists()
 
-            if has_reprovado or has_atraso:
+def stream_report(formato="text", now=None):
+    """Gerador com o relatório no formato pedido (text, csv ou jsonl)."""
+    return FORMATADORES[formato](registros_relatorio(now))
 
-                if has_reprovado and has_atraso:
-                    status = "Reprovado e Atrasado"
-                elif has_reprovado:
-                    status = "Reprovado"
-                else:
-                    status = "Atrasado"
 
-                problematic_points.append(
-                    f"- {point.nome} ({point.id}) → {status}"
-                )
+def nome_artefato(formato):
+    return f"report.{EXTENSOES[formato]}"
 
-        if problematic_points:
-            lines.append("Pontos com problemas:")
-            lines.extend(problematic_points)
-        else:
-            lines.append("Nenhum ponto com problemas 🎉")
 
-        lines.append("\n")
+# -------------------------------------------------
+# MAIN
+# -------------------------------------------------
 
-    # =================================================
-    # salvar
-    # =================================================
+def generate_report():
+    now = timezone.localtime()
+
+    base_dir = Path(__file__).resolve().parent
+    reports_dir = base_dir / "reports"
+    reports_dir.mkdir(exist_ok=True)
+
+    filename = f"report_{now.strftime('%d-%m-%Y_%H-%M')}.txt"
+    filepath = reports_dir / filename
+
+    def gerar(destino):
+        with open(destino, "w", encoding="utf-8") as f:
+            f.writelines(stream_report("text", now))
 
-    with open(filepath, "w", encoding="utf-8") as f:
-        f.write("\n".join(lines))
+    # sem escritas desde a última geração (e no mesmo dia), reaproveita
+    versao = data_version_service.versao_dados(hoje=now.date())
+    artefato = artifact_cache.obter_ou_gerar(nome_artefato("text"), versao, gerar)
+    shutil.copyfile(artefato, filepath)
 
     print(f"\nRelatório salvo em:\n{filepath}\n")
 
@@ -1,15 +1,23 @@
 import math
-from pathlib import Path
-from collections import defaultdict
+import time
+import traceback
 from datetime import date
+import numpy as np
 from django.utils import timezone
-from ortools.sat.python import cp_model
-from dateutil.relativedelta import relativedelta
 
 from core.models import (
     WaterAnalysis,
     Periodicity,
     AnalysisResult,
+    PlanStatus,
+    SchedulePlan,
+    ScheduledCollection,
+)
+from core.utils.solvers import (
+    resolver_cpsat,
+    resolver_decomposto,
+    resolver_fluxo,
+    resolver_reparo,
 )
 
 
@@ -23,247 +31,425 @@ W_DESVIO_MES = 20
 W_DESBALANCEAMENTO = 3
 FOLGA_MENSAL = 1.1
 
+TEMPO_LIMITE = 30
+
+ENGINES = ("cpsat", "flow")
 
+# =====================================================
+# DADOS (colunas)
 # =====================================================
 
-def run_scheduler():
+SEM_CLINICA = "Sem clínica"
 
-    now = timezone.localtime()
-    hoje = now.date()
 
-    # 👉 referência segura para simulação
-    first_day_this_month = date(hoje.year, hoje.month, 1)
+def colunas(linhas):
+    """
+    Converte tuplas (id, clinica_id, clinica_nome, próxima coleta,
+    resultado) no formato colunar usado pelo scheduler.
+    """
 
-    analyses = list(
-        WaterAnalysis.objects
-        .select_related("ponto__clinica", "parametro")
-        .filter(parametro__periodicidade__in=[
-            Periodicity.ANUAL,
-            Periodicity.SEMESTRAL,
-        ])
+    ids, clinicas, nomes, proximas, resultados = (
+        zip(*linhas) if linhas else ((), (), (), (), ())
     )
 
-    N = len(analyses)
+    return {
+        "ids": [str(i) for i in ids],
+        "clinicas": list(clinicas),
+        "clinica_nomes": [nome or SEM_CLINICA for nome in nomes],
+        "proxima": np.array(proximas, dtype="datetime64[D]"),
+        "reprovada": np.array(resultados, dtype=object) == AnalysisResult.REJEITADO,
+    }
 
-    # =================================================
-    # BASELINE
-    # =================================================
 
-    baseline_atrasadas = sum(
-        1 for a in analyses
-        if a.data_da_proxima_coleta < hoje
-    )
+def carregar_analises():
+    """
+    Análises elegíveis (ANUAL/SEMESTRAL), já em colunas.
 
-    baseline_reprovadas = sum(
-        1 for a in analyses
-        if a.resultado == AnalysisResult.REJEITADO
-    )
+    Só a coleta mais recente de cada (ponto, parâmetro) precisa ser
+    planejada: DISTINCT ON (ponto_id, parametro_id) ordenado por
+    data_da_coleta DESC, servido pelo índice analise_ultima_coleta_idx.
+    Assim N depende dos pares ativos, não do tamanho do histórico.
+    """
 
-    if N == 0:
-        print("Sem análises elegíveis.")
-        return {}
-
-    # -------------------------------------------------
-    # meses = deslocamento 0..11 (mais simples e seguro)
-    # -------------------------------------------------
+    return colunas(list(
+        WaterAnalysis.objects
+        .filter(parametro__periodicidade__in=[
+            Periodicity.ANUAL,
+            Periodicity.SEMESTRAL,
+        ])
+        .order_by("ponto_id", "parametro_id", "-data_da_coleta")
+        .distinct("ponto_id", "parametro_id")
+        .values_list(
+            "id",
+            "ponto__clinica_id",
+            "ponto__clinica__nome",
+            "data_da_proxima_coleta",
+            "resultado",
+        )
+    ))
 
-    months = list(range(12))
 
-    max_por_mes = math.ceil(FOLGA_MENSAL * N / 12)
+# =====================================================
+# CUSTOS
+# =====================================================
 
-    model = cp_model.CpModel()
+def capacidade_mensal(N):
+    return math.ceil(FOLGA_MENSAL * N / 12)
 
-    x = {}
 
-    for i in range(N):
-        for m in months:
-            x[i, m] = model.NewBoolVar(f"x_{i}_{m}")
+def _meses_simulados(hoje):
+    # 👉 referência segura para simulação: 1º dia de cada um dos
+    # próximos 12 meses, a partir do mês atual
+    return (
+        np.datetime64(date(hoje.year, hoje.month, 1), "M") + np.arange(12)
+    ).astype("datetime64[D]")
 
-    # cada análise em exatamente 1 mês
-    for i in range(N):
-        model.Add(sum(x[i, m] for m in months) == 1)
 
-    # limite mensal
-    for m in months:
-        model.Add(sum(x[i, m] for i in range(N)) <= max_por_mes)
+def matriz_custos(dados, hoje):
+    """
+    Matriz N×12 com o custo de coletar cada análise em cada mês
+    (deslocamento 0..11 a partir do mês atual).
+    """
 
-    # -------------------------------------------------
-    # OBJETIVO
-    # -------------------------------------------------
+    proxima = dados["proxima"]
 
-    objective_terms = []
+    atraso_dias = np.maximum(
+        (np.datetime64(hoje, "D") - proxima).astype(np.int64), 0
+    )
 
-    for i, analysis in enumerate(analyses):
+    base = atraso_dias * W_ATRASO_DIA
+    base += np.where(dados["reprovada"], atraso_dias * W_REPROVADA_DIA, 0)
 
-        atraso_dias = max(
-            (hoje - analysis.data_da_proxima_coleta).days,
-            0
-        )
+    ideal_month = proxima.astype("datetime64[M]").astype(np.int64) % 12
+    month_real = _meses_simulados(hoje).astype("datetime64[M]").astype(np.int64) % 12
 
-        reprovada = analysis.resultado == AnalysisResult.REJEITADO
+    desvio = np.abs(month_real[None, :] - ideal_month[:, None])
 
-        ideal_month = analysis.data_da_proxima_coleta.month - 1
+    return base[:, None] + desvio * W_DESVIO_MES
 
-        for m in months:
 
-            # mês real via simulação segura
-            sim_date = first_day_this_month + relativedelta(months=m)
-            month_real = sim_date.month - 1
+def resumir_plano(dados, custos, escolha, hoje):
+    """
+    Estatísticas do plano a partir da mesma matriz de custos usada
+    no objetivo: custo por análise e atraso simulado pós-plano.
+    """
 
-            cost = atraso_dias * W_ATRASO_DIA
+    escolha = np.asarray(escolha)
+    proxima = dados["proxima"]
 
-            if reprovada:
-                cost += atraso_dias * W_REPROVADA_DIA
+    custo_escolhido = custos[np.arange(len(escolha)), escolha]
 
-            desvio = abs(month_real - ideal_month)
-            cost += desvio * W_DESVIO_MES
+    sim_date = _meses_simulados(hoje)[escolha]
+    atrasada_pos_plano = sim_date > proxima
 
-            objective_terms.append(cost * x[i, m])
+    nomes, por_clinica = np.unique(dados["clinica_nomes"], return_inverse=True)
 
-    # soft capacity (excesso)
-    for m in months:
+    clinic_total = np.bincount(por_clinica, minlength=len(nomes))
+    clinic_simulated_atraso = np.bincount(
+        por_clinica, weights=atrasada_pos_plano, minlength=len(nomes)
+    ).astype(np.int64)
 
-        load = sum(x[i, m] for i in range(N))
+    return {
+        "total_cost": int(custo_escolhido.sum()),
+        "min_cost": int(custo_escolhido.min()),
+        "max_cost": int(custo_escolhido.max()),
+        "baseline_atrasadas": int((proxima < np.datetime64(hoje, "D")).sum()),
+        "baseline_reprovadas": int(dados["reprovada"].sum()),
+        "simulated_atraso_total": int(atrasada_pos_plano.sum()),
+        "por_clinica": {
+            nome: (int(clinic_total[c]), int(clinic_simulated_atraso[c]))
+            for c, nome in enumerate(nomes)
+        },
+    }
 
-        excesso = model.NewIntVar(0, N, f"excesso_{m}")
 
-        model.Add(excesso >= load - max_por_mes)
-        model.Add(excesso >= 0)
+# =====================================================
+# PLANO ANTERIOR (warm start)
+# =====================================================
 
-        objective_terms.append(W_DESBALANCEAMENTO * excesso)
+def _mes_absoluto(d):
+    return d.year * 12 + d.month - 1
 
-    model.Minimize(sum(objective_terms))
 
-    # -------------------------------------------------
-    # solver
-    # -------------------------------------------------
+def _carregar_plano_anterior(dados, hoje, plano):
+    """
+    Mês (deslocamento 0..11 a partir de hoje) de cada análise no
+    último plano concluído, ou None se ela é nova, mudou de custo ou
+    o mês anterior já saiu da janela de 12 meses.
 
-    solver = cp_model.CpSolver()
-    solver.parameters.max_time_in_seconds = 30
+    O custo relativo entre meses só depende da próxima coleta e do
+    resultado; o termo de atraso é constante na linha da análise.
+    """
 
-    status = solver.Solve(model)
+    ultimo = (
+        SchedulePlan.objects
+        .filter(status=PlanStatus.CONCLUIDO)
+        .exclude(id=plano.id)
+        .order_by("-created_at")
+        .first()
+    )
 
-    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
-        print("Sem solução viável")
-        return {}
+    if ultimo is None:
+        return None
 
-    result = {}
+    referencia = _mes_absoluto(hoje)
 
-    # =================================================
-    # COLETAR RESULTADOS
-    # =================================================
+    previo = {
+        str(analise_id): (_mes_absoluto(mes) - referencia, proxima, reprovada)
+        for analise_id, mes, proxima, reprovada in (
+            ScheduledCollection.objects
+            .filter(plano=ultimo)
+            .values_list("analise_id", "mes_planejado", "data_da_proxima_coleta", "reprovada")
+            .iterator(chunk_size=10_000)
+        )
+    }
+
+    anterior = []
+
+    for analysis_id, proxima, reprovada in zip(
+        dados["ids"], dados["proxima"].tolist(), dados["reprovada"].tolist()
+    ):
+        item = previo.get(analysis_id)
+
+        if item is None or item[1:] != (proxima, reprovada):
+            anterior.append(None)
+            continue
+
+        anterior.append(item[0] if 0 <= item[0] < 12 else None)
+
+    return anterior
+
+
+def _salvar_coletas(plano, dados, custos, escolha, hoje):
+    meses = _meses_simulados(hoje).tolist()
+    custo_escolhido = custos[np.arange(len(escolha)), escolha].tolist()
+
+    ScheduledCollection.objects.bulk_create(
+        [
+            ScheduledCollection(
+                plano=plano,
+                analise_id=analysis_id,
+                clinica_id=clinica_id,
+                mes_planejado=meses[m],
+                custo=custo,
+                data_da_proxima_coleta=proxima,
+                reprovada=reprovada,
+            )
+            for analysis_id, clinica_id, m, custo, proxima, reprovada in zip(
+                dados["ids"],
+                dados["clinicas"],
+                escolha,
+                custo_escolhido,
+                dados["proxima"].tolist(),
+                dados["reprovada"].tolist(),
+            )
+        ],
+        batch_size=5_000,
+    )
 
-    month_counts = defaultdict(int)
-    month_clinic = defaultdict(lambda: defaultdict(int))
-    clinic_total = defaultdict(int)
-    clinic_atraso = defaultdict(int)
-    clinic_reprov = defaultdict(int)
 
-    simulated_atraso_total = 0
-    clinic_simulated_atraso = defaultdict(int)
+# =====================================================
 
-    total_atraso = 0
-    total_reprov = 0
+def run_scheduler(engine="cpsat", decompose=False, compare=False,
+                  max_workers=None, warm_start=True, repair=False,
+                  aggregate=True, time_limit=TEMPO_LIMITE, num_workers=0,
+                  relative_gap=None, seed=None, plano=None):
+    """
+    Gera o plano anual de coletas {analysis_id: mês}.
+
+    engine="flow" resolve o plano exatamente como fluxo de custo
+    mínimo (ver core.utils.solvers.resolver_fluxo); as opções abaixo
+    valem para o motor "cpsat".
+
+    decompose=True resolve um subproblema por grupo de clínicas em
+    paralelo (ver core.utils.solvers.resolver_decomposto).
+    compare=True resolve também o modelo monolítico e registra os
+    dois tempos no relatório.
+    warm_start=True usa o último plano salvo como solution hint.
+    repair=True mantém fixas as análises que não mudaram desde o
+    último plano e resolve só as novas/alteradas.
+    aggregate=True modela uma variável inteira por (classe de custo,
+    mês) em vez de um booleano por (análise, mês).
+    time_limit, num_workers, relative_gap e seed ajustam a busca do
+    CP-SAT (qualidade do plano × latência).
+
+    Toda execução fica registrada em um SchedulePlan (o `plano`
+    recebido do worker ou um criado aqui), com as coletas gravadas
+    em ScheduledCollection.
+    """
+
+    if engine not in ENGINES:
+        raise ValueError(f"Motor desconhecido: {engine}. Use um de {ENGINES}.")
+
+    opcoes = dict(
+        engine=engine,
+        decompose=decompose,
+        compare=compare,
+        max_workers=max_workers,
+        warm_start=warm_start,
+        repair=repair,
+        aggregate=aggregate,
+        time_limit=time_limit,
+        num_workers=num_workers,
+        relative_gap=relative_gap,
+        seed=seed,
+    )
 
-    cost_values = []
+    if plano is not None:
+        return _planejar(plano, **opcoes)
 
-    for i, analysis in enumerate(analyses):
+    plano = SchedulePlan.objects.create(
+        status=PlanStatus.EXECUTANDO,
+        parametros={k: v for k, v in opcoes.items() if k not in ("compare", "max_workers")},
+        iniciado_em=timezone.now(),
+    )
 
-        chosen_m = next(m for m in months if solver.Value(x[i, m]))
+    try:
+        return _planejar(plano, **opcoes)
+    except Exception:
+        plano.erro = traceback.format_exc()
+        raise
+    finally:
+        plano.finalizar()
 
-        result[str(analysis.id)] = chosen_m
 
-        clinic = analysis.ponto.clinica.nome
+def _planejar(plano, engine, decompose, compare, max_workers, warm_start,
+              repair, aggregate, time_limit, num_workers, relative_gap, seed):
 
-        month_counts[chosen_m] += 1
-        month_clinic[chosen_m][clinic] += 1
-        clinic_total[clinic] += 1
+    hoje = timezone.localdate()
 
-        atraso = analysis.data_da_proxima_coleta < hoje
-        repro = analysis.resultado == AnalysisResult.REJEITADO
+    tempos = {}
 
-        if atraso:
-            clinic_atraso[clinic] += 1
-            total_atraso += 1
+    plano.atualizar_etapa("carregando análises", 5)
 
-        if repro:
-            clinic_reprov[clinic] += 1
-            total_reprov += 1
+    inicio = time.perf_counter()
+    dados = carregar_analises()
+    tempos["carga"] = time.perf_counter() - inicio
 
-        # --------------------------------------------
-        # custo individual
-        # --------------------------------------------
+    N = len(dados["ids"])
 
-        atraso_dias = max((hoje - analysis.data_da_proxima_coleta).days, 0)
+    if N == 0:
+        print("Sem análises elegíveis.")
+        return {}
 
-        sim_date = first_day_this_month + relativedelta(months=chosen_m)
-        month_real = sim_date.month - 1
-        ideal_month = analysis.data_da_proxima_coleta.month - 1
+    # -------------------------------------------------
+    # meses = deslocamento 0..11 (mais simples e seguro)
+    # -------------------------------------------------
 
-        desvio = abs(month_real - ideal_month)
+    plano.atualizar_etapa("montando custos", 20)
 
-        custo = (
-            atraso_dias * W_ATRASO_DIA
-            + (atraso_dias * W_REPROVADA_DIA if repro else 0)
-            + desvio * W_DESVIO_MES
-        )
+    inicio = time.perf_counter()
+    max_por_mes = capacidade_mensal(N)
+    custos = matriz_custos(dados, hoje)
+    tempos["custos"] = time.perf_counter() - inicio
 
-        cost_values.append(custo)
+    # -------------------------------------------------
+    # solver
+    # -------------------------------------------------
 
-        # --------------------------------------------
-        # simulação atraso pós-plano
-        # --------------------------------------------
+    plano.atualizar_etapa("resolvendo", 30)
 
-        sim_delay = max((sim_date - analysis.data_da_proxima_coleta).days, 0)
+    custo_monolitico = None
+    escolha = None
+    modo = None
+    metricas = {}
 
-        if sim_delay > 0:
-            simulated_atraso_total += 1
-            clinic_simulated_atraso[clinic] += 1
+    parametros = dict(
+        tempo_limite=time_limit,
+        num_workers=num_workers,
+        gap_relativo=relative_gap,
+        semente=seed,
+        agregar=aggregate,
+    )
 
-    min_cost = min(cost_values) if cost_values else 0
-    max_cost = max(cost_values) if cost_values else 0
-    total_cost = sum(cost_values)
+    anterior = (
+        _carregar_plano_anterior(dados, hoje, plano)
+        if engine == "cpsat" and (warm_start or repair) else None
+    )
 
-    # =================================================
-    # RELATÓRIO
-    # =================================================
+    if engine == "flow":
+        modo = "fluxo de custo mínimo"
+        inicio = time.perf_counter()
+        escolha = resolver_fluxo(custos, max_por_mes, metricas=metricas)
+        tempos["fluxo"] = time.perf_counter() - inicio
+
+    if engine == "cpsat" and repair and anterior is not None:
+        inicio = time.perf_counter()
+        escolha = resolver_reparo(
+            custos, anterior, max_por_mes, W_DESBALANCEAMENTO,
+            metricas=metricas, **parametros,
+        )
+        tempos["reparo"] = time.perf_counter() - inicio
+
+        if escolha is None:
+            print("Reparo inviável, replanejando tudo.")
+            metricas = {}
+        else:
+            modo = "reparo"
+
+    if engine == "cpsat" and escolha is None and decompose:
+        modo = "decomposto"
+        inicio = time.perf_counter()
+        escolha = resolver_decomposto(
+            custos,
+            dados["clinicas"],
+            max_por_mes,
+            W_DESBALANCEAMENTO,
+            max_workers=max_workers,
+            dica=anterior,
+            metricas=metricas,
+            **parametros,
+        )
+        tempos["decomposto"] = time.perf_counter() - inicio
+
+    if modo is None or compare:
+        metricas_monolitico = metricas if modo is None else {}
+        inicio = time.perf_counter()
+        monolitico = resolver_cpsat(
+            custos, max_por_mes, W_DESBALANCEAMENTO,
+            dica=anterior, metricas=metricas_monolitico, **parametros,
+        )
+        tempos["monolitico"] = time.perf_counter() - inicio
 
-    reports_dir = Path(__file__).parent / "schedule"
-    reports_dir.mkdir(exist_ok=True)
+        if modo is None:
+            modo = "monolítico"
+            escolha = monolitico
+        elif monolitico is not None:
+            custo_monolitico = int(custos[np.arange(N), monolitico].sum())
+            metricas["comparacao_monolitico"] = metricas_monolitico
 
-    filename = f"generated_schedule_{now.strftime('%d-%m-%Y_%H-%M')}.txt"
-    filepath = reports_dir / filename
+    metricas["analises"] = N
+    if anterior is not None:
+        metricas["analises_plano_anterior"] = sum(1 for m in anterior if m is not None)
 
-    lines = []
+    if escolha is None:
+        print("Sem solução viável")
+        plano.erro = "Sem solução viável"
+        plano.tempos = {etapa: round(segundos, 4) for etapa, segundos in tempos.items()}
+        plano.metricas = metricas
+        plano.save(update_fields=["erro", "tempos", "metricas"])
+        return {}
 
-    lines.append("=" * 80)
-    lines.append("PLANO ANUAL DE COLETAS (MILP)")
-    lines.append("=" * 80)
-    lines.append("")
+    plano.atualizar_etapa("gravando coletas", 80)
 
-    lines.append(f"Total análises: {N}")
-    lines.append(f"Atrasadas antes: {baseline_atrasadas}")
-    lines.append(f"Reprovadas antes: {baseline_reprovadas}")
-    lines.append(f"Atrasadas após simulação: {simulated_atraso_total}")
-    lines.append("")
+    inicio = time.perf_counter()
+    _salvar_coletas(plano, dados, custos, escolha, hoje)
+    tempos["gravacao"] = time.perf_counter() - inicio
 
-    lines.append(f"Custo total: {total_cost}")
-    lines.append(f"Custo mínimo: {min_cost}")
-    lines.append(f"Custo máximo: {max_cost}")
-    lines.append("")
+    plano.atualizar_etapa("resumindo plano", 90)
 
-    lines.append("===== RESUMO POR CLÍNICA =====")
+    result = dict(zip(dados["ids"], escolha))
 
-    for clinic in sorted(clinic_total):
-        lines.append(
-            f"{clinic}: "
-            f"Total={clinic_total[clinic]} | "
-            f"Atrasadas após plano={clinic_simulated_atraso[clinic]}"
-        )
+    inicio = time.perf_counter()
+    resumo = resumir_plano(dados, custos, escolha, hoje)
+    tempos["resumo"] = time.perf_counter() - inicio
 
-    with open(filepath, "w", encoding="utf-8") as f:
-        f.write("\n".join(lines))
+    if custo_monolitico is not None:
+        resumo["custo_monolitico"] = custo_monolitico
 
-    print(f"\nRelatório salvo em:\n{filepath}\n")
+    plano.tempos = {etapa: round(segundos, 4) for etapa, segundos in tempos.items()}
+    plano.resumo = {**resumo, "modo": modo, "total_analises": N}
+    plano.metricas = metricas
+    plano.save(update_fields=["tempos", "resumo", "metricas"])
 
     return result
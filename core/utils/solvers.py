@@ -0,0 +1,595 @@
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from ortools.graph.python import min_cost_flow
+from ortools.sat.python import cp_model
+
+
+# =====================================================
+# Solvers puros (sem Django) do plano anual de coletas.
+# Recebem a matriz de custos N×12 e devolvem o mês
+# (deslocamento 0..11) escolhido para cada análise.
+# Ficam fora de scheduler.py para poderem rodar em
+# processos filhos sem carregar o ORM.
+# =====================================================
+
+MESES = list(range(12))
+
+
+# -------------------------------------------------
+# MONOLÍTICO
+# -------------------------------------------------
+
+def _capacidades(max_por_mes):
+    if isinstance(max_por_mes, int):
+        return [max_por_mes] * 12
+    return list(max_por_mes)
+
+
+# -------------------------------------------------
+# CLASSES DE CUSTO
+# -------------------------------------------------
+
+def agrupar_classes(custos):
+    """
+    Agrupa análises com o mesmo vetor de custos nos 12 meses: para o
+    solver elas são indistinguíveis. Retorna (vetores, membros), com
+    membros[k] = índices das análises da classe k.
+    """
+
+    custos = np.asarray(custos, dtype=np.int64)
+
+    vetores, inverso = np.unique(custos, axis=0, return_inverse=True)
+    inverso = inverso.reshape(-1)
+
+    ordem = np.argsort(inverso, kind="stable")
+    cortes = np.cumsum(np.bincount(inverso, minlength=len(vetores)))[:-1]
+
+    membros = [grupo.tolist() for grupo in np.split(ordem, cortes)]
+
+    return vetores.tolist(), membros
+
+
+def expandir_classes(membros, contagens, N, dica=None):
+    """
+    Converte contagens[k][m] (quantas análises da classe k vão no
+    mês m) de volta em um mês por análise. Com `dica`, quem já estava
+    num mês que recebeu vagas da classe continua nele.
+    """
+
+    escolha = [None] * N
+
+    for k, indices in enumerate(membros):
+
+        vagas = list(contagens[k])
+
+        if dica is not None:
+            for i in indices:
+                m = dica[i]
+                if m is not None and vagas[m] > 0:
+                    escolha[i] = m
+                    vagas[m] -= 1
+
+        m = 0
+        for i in indices:
+            if escolha[i] is not None:
+                continue
+            while vagas[m] == 0:
+                m += 1
+            escolha[i] = m
+            vagas[m] -= 1
+
+    return escolha
+
+
+def _resolver_modelo(model, metricas, tempo_limite, num_workers, gap_relativo,
+                     semente, inicio):
+    """
+    Configura e roda o CpSolver, registrando em `metricas` o tamanho
+    do modelo, os tempos e as estatísticas da busca.
+    """
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = tempo_limite
+    solver.parameters.num_workers = num_workers
+
+    if gap_relativo is not None:
+        solver.parameters.relative_gap_limit = gap_relativo
+    if semente is not None:
+        solver.parameters.random_seed = semente
+
+    tempo_modelo = time.perf_counter() - inicio
+
+    status = solver.Solve(model)
+
+    if metricas is not None:
+        proto = model.Proto()
+        resolvido = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+        objetivo = solver.ObjectiveValue() if resolvido else None
+        limite = solver.BestObjectiveBound() if resolvido else None
+
+        metricas.update(
+            motor="cpsat",
+            variaveis=len(proto.variables),
+            restricoes=len(proto.constraints),
+            tempo_modelo=round(tempo_modelo, 4),
+            tempo_solver=round(solver.WallTime(), 4),
+            status=solver.StatusName(status),
+            objetivo=objetivo,
+            melhor_limite=limite,
+            gap=(
+                abs(objetivo - limite) / max(abs(objetivo), 1)
+                if resolvido else None
+            ),
+            conflitos=solver.NumConflicts(),
+            ramificacoes=solver.NumBranches(),
+            num_workers=num_workers or os.cpu_count(),
+            tempo_limite=tempo_limite,
+            gap_relativo=gap_relativo,
+            semente=semente,
+        )
+
+    return solver, status
+
+
+def _resolver_cpsat_classes(custos, capacidade, peso_excesso, dica, metricas,
+                            parametros):
+    """
+    Mesmo modelo de resolver_cpsat, mas com um inteiro por
+    (classe de custo, mês) em vez de um booleano por (análise, mês):
+    o tamanho do modelo depende do número de classes, não de N.
+    """
+
+    inicio = time.perf_counter()
+
+    N = len(custos)
+
+    vetores, membros = agrupar_classes(custos)
+    K = len(vetores)
+
+    model = cp_model.CpModel()
+
+    y = {}
+
+    for k in range(K):
+        for m in MESES:
+            y[k, m] = model.NewIntVar(0, len(membros[k]), f"y_{k}_{m}")
+
+    # cada classe distribui exatamente todas as suas análises
+    for k in range(K):
+        model.Add(sum(y[k, m] for m in MESES) == len(membros[k]))
+
+    # limite mensal
+    for m in MESES:
+        model.Add(sum(y[k, m] for k in range(K)) <= capacidade[m])
+
+    # warm start: quantas análises de cada classe estavam em cada mês
+    if dica is not None:
+        for k, indices in enumerate(membros):
+            anteriores = [dica[i] for i in indices]
+            if None in anteriores:
+                continue
+            for m in MESES:
+                model.AddHint(y[k, m], anteriores.count(m))
+
+    objective_terms = []
+
+    for k in range(K):
+        for m in MESES:
+            objective_terms.append(vetores[k][m] * y[k, m])
+
+    # soft capacity (excesso)
+    for m in MESES:
+
+        load = sum(y[k, m] for k in range(K))
+
+        excesso = model.NewIntVar(0, N, f"excesso_{m}")
+
+        model.Add(excesso >= load - capacidade[m])
+        model.Add(excesso >= 0)
+
+        objective_terms.append(peso_excesso * excesso)
+
+    model.Minimize(sum(objective_terms))
+
+    solver, status = _resolver_modelo(model, metricas, inicio=inicio, **parametros)
+
+    if metricas is not None:
+        metricas["classes"] = K
+
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return None
+
+    contagens = [
+        [solver.Value(y[k, m]) for m in MESES]
+        for k in range(K)
+    ]
+
+    return expandir_classes(membros, contagens, N, dica)
+
+
+def resolver_cpsat(custos, max_por_mes, peso_excesso, tempo_limite=30,
+                   num_workers=0, dica=None, agregar=True, metricas=None,
+                   gap_relativo=None, semente=None):
+    """
+    Modelo CP-SAT original: um booleano por (análise, mês),
+    capacidade mensal rígida e penalidade linear de excesso.
+    max_por_mes pode ser um inteiro ou uma lista com 12 capacidades.
+    `dica` (mês anterior de cada análise ou None) vira solution hint.
+    agregar=True resolve por classes de custo (_resolver_cpsat_classes).
+    tempo_limite, num_workers, gap_relativo e semente vão para o
+    CpSolver. Se `metricas` for um dict, recebe tamanho do modelo,
+    tempos e estatísticas da busca (ver _resolver_modelo).
+    Retorna a lista de meses escolhidos ou None se inviável.
+    """
+
+    inicio = time.perf_counter()
+
+    N = len(custos)
+
+    capacidade = _capacidades(max_por_mes)
+
+    parametros = dict(
+        tempo_limite=tempo_limite,
+        num_workers=num_workers,
+        gap_relativo=gap_relativo,
+        semente=semente,
+    )
+
+    if agregar:
+        return _resolver_cpsat_classes(
+            custos, capacidade, peso_excesso, dica, metricas, parametros
+        )
+
+    custos = np.asarray(custos, dtype=np.int64).tolist()
+
+    model = cp_model.CpModel()
+
+    x = {}
+
+    for i in range(N):
+        for m in MESES:
+            x[i, m] = model.NewBoolVar(f"x_{i}_{m}")
+
+    # cada análise em exatamente 1 mês
+    for i in range(N):
+        model.Add(sum(x[i, m] for m in MESES) == 1)
+
+    # limite mensal
+    for m in MESES:
+        model.Add(sum(x[i, m] for i in range(N)) <= capacidade[m])
+
+    # warm start: plano anterior como ponto de partida
+    if dica is not None:
+        for i, anterior in enumerate(dica):
+            if anterior is None:
+                continue
+            for m in MESES:
+                model.AddHint(x[i, m], int(m == anterior))
+
+    objective_terms = []
+
+    for i in range(N):
+        for m in MESES:
+            objective_terms.append(custos[i][m] * x[i, m])
+
+    # soft capacity (excesso)
+    for m in MESES:
+
+        load = sum(x[i, m] for i in range(N))
+
+        excesso = model.NewIntVar(0, N, f"excesso_{m}")
+
+        model.Add(excesso >= load - capacidade[m])
+        model.Add(excesso >= 0)
+
+        objective_terms.append(peso_excesso * excesso)
+
+    model.Minimize(sum(objective_terms))
+
+    solver, status = _resolver_modelo(model, metricas, inicio=inicio, **parametros)
+
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return None
+
+    return [
+        next(m for m in MESES if solver.Value(x[i, m]))
+        for i in range(N)
+    ]
+
+
+# -------------------------------------------------
+# REPARO INCREMENTAL
+# -------------------------------------------------
+
+def resolver_reparo(custos, anterior, max_por_mes, peso_excesso,
+                    metricas=None, **parametros):
+    """
+    Mantém fixas as análises que já têm mês no plano anterior
+    (anterior[i] não é None) e resolve apenas as demais, usando a
+    capacidade que sobrou em cada mês. Retorna None se as fixas já
+    estouram a capacidade (aí é preciso replanejar tudo).
+    `parametros` vão para resolver_cpsat.
+    """
+
+    carga_fixa = [0] * 12
+
+    for m in anterior:
+        if m is not None:
+            carga_fixa[m] += 1
+
+    sobra = [max_por_mes - carga for carga in carga_fixa]
+
+    if min(sobra) < 0:
+        if metricas is not None:
+            metricas["status"] = "INFEASIBLE"
+        return None
+
+    livres = [i for i, m in enumerate(anterior) if m is None]
+
+    escolha = list(anterior)
+
+    if metricas is not None:
+        metricas["fixadas"] = len(anterior) - len(livres)
+
+    if not livres:
+        if metricas is not None:
+            metricas["status"] = "OPTIMAL"
+        return escolha
+
+    parcial = resolver_cpsat(
+        np.asarray(custos)[livres],
+        sobra,
+        peso_excesso,
+        metricas=metricas,
+        **parametros,
+    )
+
+    if parcial is None:
+        return None
+
+    for i, m in zip(livres, parcial):
+        escolha[i] = m
+
+    return escolha
+
+
+# -------------------------------------------------
+# DECOMPOSTO (por clínica / grupo de clínicas)
+# -------------------------------------------------
+
+def agrupar_clinicas(clinicas, n_grupos):
+    """
+    Distribui as clínicas em até n_grupos subproblemas de tamanho
+    parecido (maior primeiro no grupo mais leve).
+    `clinicas` é a lista com a chave de clínica de cada análise.
+    Retorna lista de listas de índices de análises.
+    """
+
+    por_clinica = {}
+
+    for i, clinica in enumerate(clinicas):
+        por_clinica.setdefault(clinica, []).append(i)
+
+    n_grupos = max(1, min(n_grupos, len(por_clinica)))
+
+    grupos = [[] for _ in range(n_grupos)]
+
+    for indices in sorted(por_clinica.values(), key=len, reverse=True):
+        min(grupos, key=len).extend(indices)
+
+    return [g for g in grupos if g]
+
+
+def _resolver_subproblema(args):
+    custos, capacidade, peso_excesso, dica, parametros = args
+    metricas = {}
+    escolha = resolver_cpsat(
+        custos, capacidade, peso_excesso, dica=dica, metricas=metricas, **parametros
+    )
+    return escolha, metricas
+
+
+def rebalancear(custos, escolha, max_por_mes):
+    """
+    Passo coordenador: as cotas proporcionais arredondadas podem
+    somar mais que max_por_mes em algum mês. Move, dos meses
+    estourados, as análises com menor custo marginal para o mês
+    mais barato que ainda tenha vaga.
+    """
+
+    carga = [0] * 12
+
+    for m in escolha:
+        carga[m] += 1
+
+    for m in MESES:
+
+        excesso = carga[m] - max_por_mes
+
+        if excesso <= 0:
+            continue
+
+        candidatos = []
+
+        for i, atual in enumerate(escolha):
+            if atual != m:
+                continue
+
+            destinos = [d for d in MESES if d != m and carga[d] < max_por_mes]
+            if not destinos:
+                break
+
+            destino = min(destinos, key=lambda d: custos[i][d])
+            candidatos.append((custos[i][destino] - custos[i][m], i))
+
+        candidatos.sort()
+
+        for _, i in candidatos:
+            if excesso <= 0:
+                break
+
+            destinos = [d for d in MESES if d != m and carga[d] < max_por_mes]
+            if not destinos:
+                break
+
+            destino = min(destinos, key=lambda d: custos[i][d])
+
+            escolha[i] = destino
+            carga[m] -= 1
+            carga[destino] += 1
+            excesso -= 1
+
+    return escolha
+
+
+def resolver_decomposto(custos, clinicas, max_por_mes, peso_excesso,
+                        max_workers=None, dica=None, metricas=None,
+                        **parametros):
+    """
+    Resolve um subproblema CP-SAT por grupo de clínicas, em paralelo
+    num pool de processos, cada um com uma cota de max_por_mes
+    proporcional ao seu tamanho. Depois rebalanceia a carga mensal.
+    `parametros` vão para resolver_cpsat de cada subproblema.
+    """
+
+    N = len(custos)
+    custos = np.asarray(custos)
+
+    max_workers = max_workers or os.cpu_count() or 1
+
+    grupos = agrupar_clinicas(clinicas, max_workers)
+
+    # os workers pedidos (0 = todos os núcleos) são divididos entre os
+    # processos simultâneos, para não haver disputa
+    total_workers = parametros.get("num_workers") or os.cpu_count() or 1
+    processos = min(max_workers, len(grupos), total_workers)
+    parametros["num_workers"] = total_workers // processos
+
+    tarefas = [
+        (
+            custos[grupo],
+            math.ceil(max_por_mes * len(grupo) / N),
+            peso_excesso,
+            [dica[i] for i in grupo] if dica is not None else None,
+            parametros,
+        )
+        for grupo in grupos
+    ]
+
+    escolha = [None] * N
+    subs = []
+
+    with ProcessPoolExecutor(max_workers=processos) as pool:
+        for grupo, (parcial, sub) in zip(grupos, pool.map(_resolver_subproblema, tarefas)):
+
+            subs.append(sub)
+
+            if parcial is None:
+                if metricas is not None:
+                    metricas["status"] = sub.get("status")
+                return None
+
+            for i, m in zip(grupo, parcial):
+                escolha[i] = m
+
+    escolha = rebalancear(custos, escolha, max_por_mes)
+
+    if metricas is not None:
+        # o rebalanceamento muda o plano: a prova de ótimo dos
+        # subproblemas não vale para o todo
+        metricas.update(
+            motor="cpsat",
+            status="FEASIBLE",
+            objetivo=float(custos[np.arange(N), escolha].sum()),
+            subproblemas=len(grupos),
+            status_subproblemas=[sub.get("status") for sub in subs],
+            variaveis=sum(sub.get("variaveis", 0) for sub in subs),
+            restricoes=sum(sub.get("restricoes", 0) for sub in subs),
+            conflitos=sum(sub.get("conflitos", 0) for sub in subs),
+            ramificacoes=sum(sub.get("ramificacoes", 0) for sub in subs),
+            tempo_solver=max(sub.get("tempo_solver", 0) for sub in subs),
+            num_workers=parametros["num_workers"] * processos,
+        )
+
+    return escolha
+
+
+# -------------------------------------------------
+# FLUXO DE CUSTO MÍNIMO (exato)
+# -------------------------------------------------
+
+def resolver_fluxo(custos, max_por_mes, metricas=None):
+    """
+    O plano é um problema de transporte: cada classe de custo (oferta
+    = nº de análises) vai para os meses (capacidade max_por_mes) com
+    custo unitário custos[i][m]. Resolve exatamente com
+    SimpleMinCostFlow em tempo polinomial.
+
+    Rede: classe → mês (cap. tamanho da classe, custo c) → sumidouro
+    (cap. do mês). A capacidade é rígida como no CP-SAT, onde o termo
+    de excesso fica sempre zerado; por isso não há arco de estouro.
+    """
+
+    inicio = time.perf_counter()
+
+    N = len(custos)
+    capacidade = _capacidades(max_por_mes)
+
+    vetores, membros = agrupar_classes(custos)
+    K = len(vetores)
+    tamanhos = np.array([len(indices) for indices in membros], dtype=np.int64)
+
+    sumidouro = K + 12
+
+    origem = np.repeat(np.arange(K), 12)
+    destino = np.tile(np.arange(K, K + 12), K)
+    custo = np.asarray(vetores, dtype=np.int64).reshape(-1)
+
+    fluxo = min_cost_flow.SimpleMinCostFlow()
+
+    arcos = fluxo.add_arcs_with_capacity_and_unit_cost(
+        origem, destino, np.repeat(tamanhos, 12), custo
+    )
+
+    fluxo.add_arcs_with_capacity_and_unit_cost(
+        np.arange(K, K + 12),
+        np.full(12, sumidouro),
+        np.asarray(capacidade, dtype=np.int64),
+        np.zeros(12, dtype=np.int64),
+    )
+
+    fluxo.set_nodes_supplies(np.arange(K), tamanhos)
+    fluxo.set_node_supply(sumidouro, -N)
+
+    tempo_modelo = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+
+    status = fluxo.solve()
+
+    if metricas is not None:
+        resolvido = status == fluxo.OPTIMAL
+        objetivo = float(fluxo.optimal_cost()) if resolvido else None
+
+        # fluxo de custo mínimo é exato: limite = objetivo, gap zero
+        metricas.update(
+            motor="flow",
+            variaveis=fluxo.num_arcs(),
+            restricoes=fluxo.num_nodes(),
+            classes=K,
+            tempo_modelo=round(tempo_modelo, 4),
+            tempo_solver=round(time.perf_counter() - inicio, 4),
+            status="OPTIMAL" if resolvido else "INFEASIBLE",
+            objetivo=objetivo,
+            melhor_limite=objetivo,
+            gap=0.0 if resolvido else None,
+        )
+
+    if status != fluxo.OPTIMAL:
+        return None
+
+    contagens = fluxo.flows(arcos).reshape(K, 12).tolist()
+
+    return expandir_classes(membros, contagens, N)